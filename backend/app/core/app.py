@@ -1,10 +1,37 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from collections.abc import Awaitable, Callable
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi_pagination import add_pagination
 
 from app.core.config import settings
 
+# Folga para os cabeçalhos do multipart além do próprio arquivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+async def reject_oversized_uploads(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Refuse uploads by Content-Length before the multipart body is read."""
+    if request.method == "POST" and request.url.path == "/documents/upload":
+        content_length = request.headers.get("content-length")
+        if (
+            content_length
+            and content_length.isdigit()
+            and int(content_length) > settings.app.max_file_size + MULTIPART_OVERHEAD
+        ):
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "detail": f"File exceeds the maximum size of {settings.app.max_file_size} bytes"
+                },
+            )
+
+    return await call_next(request)
+
 
 def include_routes(fastapi: FastAPI) -> None:
     from app.routers import include_all_routers
@@ -17,6 +44,10 @@ def get_application() -> FastAPI:
     from starlette.middleware.cors import CORSMiddleware
 
     from app.core.db import close_database_connection, connect_database
+    from app.core.vector_index import vector_indexes
+    from app.documents.ingestion import ingestion_workers
+    from app.documents.ocr import ocr_engine
+    from app.rag.depends import init_rag_service
 
     fastapi = FastAPI(
         title="Document Processor API",
@@ -28,6 +59,7 @@ def get_application() -> FastAPI:
         },
     )
 
+    fastapi.middleware("http")(reject_oversized_uploads)
     fastapi.add_middleware(
         CORSMiddleware,
         allow_origins=settings.app.cors_origins,
@@ -37,7 +69,14 @@ def get_application() -> FastAPI:
     )
 
     fastapi.add_event_handler("startup", connect_database)
+    fastapi.add_event_handler("startup", vector_indexes.migrate_legacy_chunks)
+    fastapi.add_event_handler("startup", vector_indexes.start)
+    fastapi.add_event_handler("startup", ingestion_workers.start)
+    fastapi.add_event_handler("startup", init_rag_service)
+    fastapi.add_event_handler("shutdown", ingestion_workers.stop)
+    fastapi.add_event_handler("shutdown", vector_indexes.stop)
     fastapi.add_event_handler("shutdown", close_database_connection)
+    fastapi.add_event_handler("shutdown", ocr_engine.shutdown)
 
     include_routes(fastapi)
     add_pagination(fastapi)
@@ -1,16 +1,26 @@
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any, cast
 
 from loguru import logger
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
 from app.core.db_model import PostgresBase
+from app.core.db_pool import InstrumentedPool
 
+# Um único pool para ORM, vector store e caches, descartado no shutdown
 engine = create_async_engine(
     settings.database.url,
     echo=settings.app.debug,
     future=True,
+    poolclass=InstrumentedPool,
+    pool_size=settings.database.pool_size,
+    max_overflow=settings.database.max_overflow,
+    pool_timeout=settings.database.pool_timeout,
+    pool_recycle=settings.database.pool_recycle,
+    pool_pre_ping=settings.database.pool_pre_ping,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -19,6 +29,17 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# create_all só cria tabelas novas; colunas e índices adicionados a tabelas
+# existentes são aplicados aqui de forma idempotente.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('portuguese'::regconfig, content) "
+    "|| to_tsvector('english'::regconfig, content)) STORED",
+]
+
 
 @asynccontextmanager
 async def get_db_session() -> AsyncGenerator[AsyncSession]:
@@ -45,7 +66,11 @@ async def connect_database() -> None:
 
     try:
         async with engine.begin() as conn:
+            # Tabelas com colunas vector dependem da extensão já existir
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             await conn.run_sync(PostgresBase.metadata.create_all)
+            for statement in SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
 
         logger.info("Database connected successfully!")
 
@@ -54,6 +79,10 @@ async def connect_database() -> None:
         raise
 
 
+def pool_stats() -> dict[str, Any]:
+    return cast(InstrumentedPool, engine.pool).stats()
+
+
 async def close_database_connection() -> None:
     logger.info("Closing database connection...")
     await engine.dispose()
@@ -0,0 +1,65 @@
+"""Pool de conexões com métricas de ocupação e espera."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long checkouts wait for a connection.
+
+    A checkout is counted as waiting when every connection, overflow
+    included, was already in use. The timing covers the whole checkout,
+    including opening a new connection and the pre-ping.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.size() + max(self._max_overflow, 0)
+
+    def connect(self) -> PoolProxiedConnection:
+        saturated = self.checkedout() >= self.capacity
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.checkouts += 1
+        self.waits += saturated
+        self.wait_seconds_total += elapsed
+        self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+        self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return connection
+
+    def stats(self) -> dict[str, Any]:
+        checked_out = self.checkedout()
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "saturation": round(checked_out / self.capacity, 4) if self.capacity else 0.0,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 2)
+            if self.checkouts
+            else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import json
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Any
 from uuid import uuid4
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -64,3 +65,13 @@ def create_list_response[T](
         request_id=request_id or str(uuid4()),
         timestamp=datetime.now(),
     )
+
+
+def create_sse_event(event: str, data: BaseModel | dict[str, Any]) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    payload = (
+        data.model_dump_json()
+        if isinstance(data, BaseModel)
+        else json.dumps(data, ensure_ascii=False, default=str)
+    )
+    return f"event: {event}\ndata: {payload}\n\n"
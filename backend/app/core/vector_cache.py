@@ -0,0 +1,199 @@
+"""Cache em memória das matrizes de embeddings por documento."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.core.config import VectorCacheConfig, settings
+
+
+@dataclass
+class DocumentVectors:
+    """Chunks of one document with their embeddings as a contiguous float32 matrix."""
+
+    chunk_indexes: np.ndarray
+    contents: list[str]
+    matrix: np.ndarray
+    norms: np.ndarray
+    size_bytes: int
+    expires_at: float
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[tuple[int, str, Sequence[float]]], ttl_seconds: float
+    ) -> DocumentVectors:
+        matrix = np.ascontiguousarray([row[2] for row in rows], dtype=np.float32)
+        if not rows:
+            # Documento sem chunks (na fila, com falha ou inexistente): busca vazia
+            matrix = np.empty((0, 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(rows), -1)
+        contents = [row[1] for row in rows]
+        chunk_indexes = np.fromiter((row[0] for row in rows), dtype=np.int32, count=len(rows))
+        norms = np.linalg.norm(matrix, axis=1)
+        size_bytes = (
+            matrix.nbytes
+            + norms.nbytes
+            + chunk_indexes.nbytes
+            + sum(len(content.encode()) for content in contents)
+        )
+        return cls(
+            chunk_indexes,
+            contents,
+            matrix,
+            norms,
+            size_bytes,
+            time.monotonic() + ttl_seconds,
+        )
+
+    def search(self, embedding: Sequence[float], metric: str, limit: int) -> list[dict[str, Any]]:
+        """Top-``limit`` chunks with the same distances pgvector would return."""
+        if not self.contents:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        dots = self.matrix @ query
+        if metric == "cosine":
+            denominator = self.norms * np.linalg.norm(query)
+            similarity = np.divide(
+                dots, denominator, out=np.zeros_like(dots), where=denominator > 0
+            )
+            distances = 1 - similarity
+        elif metric == "euclidean":
+            squared = self.norms**2 - 2 * dots + float(query @ query)
+            distances = np.sqrt(np.maximum(squared, 0))
+        else:
+            # <#> devolve o produto interno negativo
+            distances = -dots
+
+        limit = min(limit, len(distances))
+        top = np.argpartition(distances, limit - 1)[:limit]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [
+            {
+                "chunk_id": int(self.chunk_indexes[i]),
+                "content": self.contents[i],
+                "distance": float(distances[i]),
+            }
+            for i in top
+        ]
+
+
+class DocumentVectorCache:
+    """LRU of per-document embedding matrices bounded by ``max_bytes``.
+
+    Loads of the same document share one query. Entries are dropped when the
+    store writes or deletes chunks of the document and expire after
+    ``ttl_seconds``, which bounds how long another worker may serve vectors
+    of a re-ingested document.
+    """
+
+    def __init__(self, config: VectorCacheConfig | None = None) -> None:
+        self.config = config or settings.vector_cache
+        self._entries: OrderedDict[int, DocumentVectors] = OrderedDict()
+        self._pending: dict[int, asyncio.Future[DocumentVectors | None]] = {}
+        # Cargas em andamento invalidadas no meio do caminho não entram no cache
+        self._stale_loads: set[int] = set()
+        self.size_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    async def get(
+        self,
+        document_id: int,
+        load: Callable[[], Awaitable[Sequence[tuple[int, str, Sequence[float]]] | None]],
+    ) -> DocumentVectors | None:
+        """Return the cached vectors of a document, loading them on a miss.
+
+        ``load`` returns ``None`` when the document is too large to cache; the
+        caller then searches the database.
+        """
+        entry = self._entries.get(document_id)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(document_id)
+                self.hits += 1
+                return entry
+            self._remove(document_id)
+
+        pending = self._pending.get(document_id)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future: asyncio.Future[DocumentVectors | None] = asyncio.get_running_loop().create_future()
+        self._pending[document_id] = future
+        try:
+            rows = await load()
+            entry = (
+                DocumentVectors.from_rows(rows, self.config.ttl_seconds)
+                if rows is not None
+                else None
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._pending[document_id]
+            stale = document_id in self._stale_loads
+            self._stale_loads.discard(document_id)
+
+        future.set_result(entry)
+        if entry is not None and not stale:
+            self._put(document_id, entry)
+        return entry
+
+    def invalidate(self, document_id: int) -> None:
+        if document_id in self._pending:
+            self._stale_loads.add(document_id)
+        self._remove(document_id)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.config.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "documents": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.config.max_bytes,
+        }
+
+    def _put(self, document_id: int, entry: DocumentVectors) -> None:
+        if entry.size_bytes > self.config.max_bytes:
+            return
+        self._remove(document_id)
+        self._entries[document_id] = entry
+        self.size_bytes += entry.size_bytes
+        while self.size_bytes > self.config.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.size_bytes
+            self.evictions += 1
+
+    def _remove(self, document_id: int) -> None:
+        entry = self._entries.pop(document_id, None)
+        if entry is not None:
+            self.size_bytes -= entry.size_bytes
+
+
+document_vector_cache = DocumentVectorCache()
@@ -0,0 +1,416 @@
+"""Gerenciamento dos índices da tabela document_chunks e migração das tabelas do LangChain.
+
+Usage::
+
+    uv run python -m app.core.vector_index status
+    uv run python -m app.core.vector_index ensure
+    uv run python -m app.core.vector_index rebuild
+    uv run python -m app.core.vector_index check
+    uv run python -m app.core.vector_index migrate
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import PGVectorConfig, settings
+from app.core.db import engine as default_engine
+
+CHUNK_TABLE = "document_chunks"
+# Um índice HNSW por modo de quantização, para trocar de modo sem perder o anterior
+HNSW_INDEXES = {
+    "none": "ix_document_chunks_embedding_hnsw",
+    "halfvec": "ix_document_chunks_embedding_halfvec_hnsw",
+    "binary": "ix_document_chunks_embedding_binary_hnsw",
+}
+LEXICAL_INDEX = "ix_document_chunks_search_vector"
+# Consulta de texto nas mesmas configurações da coluna search_vector
+TSQUERY_SQL = (
+    "(websearch_to_tsquery('portuguese'::regconfig, :query) "
+    "|| websearch_to_tsquery('english'::regconfig, :query))"
+)
+# Índice da constraint única (document_id, chunk_index), criado junto com a tabela
+DOCUMENT_INDEX = "uq_document_chunks_document_chunk"
+
+LEGACY_EMBEDDING_TABLE = "langchain_pg_embedding"
+LEGACY_COLLECTION_TABLE = "langchain_pg_collection"
+
+# Chunks de documentos que já não existem ficam de fora pelo JOIN com documents
+MIGRATE_LEGACY_SQL = f"""
+    INSERT INTO {CHUNK_TABLE} (document_id, chunk_index, content, embedding)
+    SELECT
+        d.id,
+        CAST(e.cmetadata->>'chunk_id' AS integer),
+        COALESCE(e.document, ''),
+        e.embedding
+    FROM {LEGACY_EMBEDDING_TABLE} e
+    JOIN {LEGACY_COLLECTION_TABLE} c ON c.uuid = e.collection_id
+    JOIN documents d ON d.id = CAST(e.cmetadata->>'document_id' AS integer)
+    WHERE c.name = :collection
+      AND e.cmetadata->>'chunk_id' IS NOT NULL
+    ON CONFLICT (document_id, chunk_index) DO NOTHING
+"""
+
+DISTANCE_OPERATORS = {"cosine": "<=>", "euclidean": "<->", "inner_product": "<#>"}
+
+OPERATOR_CLASSES = {
+    "cosine": "vector_cosine_ops",
+    "euclidean": "vector_l2_ops",
+    "inner_product": "vector_ip_ops",
+}
+
+
+def search_terms(config: PGVectorConfig) -> tuple[str, str, str, str]:
+    """Return the indexed expression, query expression, operator and operator class.
+
+    The query expression reads the search vector from the ``:embedding``
+    parameter. With quantization the indexed expression is a ``halfvec`` or
+    binary projection of ``embedding``, which the query must repeat verbatim
+    for the planner to pick the expression index.
+    """
+    dimension = int(config.embedding_dimension)
+    metric = config.distance_metric
+    if config.quantization == "halfvec":
+        return (
+            f"CAST(embedding AS halfvec({dimension}))",
+            f"CAST(:embedding AS halfvec({dimension}))",
+            DISTANCE_OPERATORS[metric],
+            OPERATOR_CLASSES[metric].replace("vector_", "halfvec_"),
+        )
+    if config.quantization == "binary":
+        return (
+            f"CAST(binary_quantize(embedding) AS bit({dimension}))",
+            "binary_quantize(CAST(:embedding AS vector))",
+            "<~>",
+            "bit_hamming_ops",
+        )
+    return (
+        "embedding",
+        "CAST(:embedding AS vector)",
+        DISTANCE_OPERATORS[metric],
+        OPERATOR_CLASSES[metric],
+    )
+
+
+# Chave do advisory lock que impede dois processos de criarem índices ao mesmo tempo
+INDEX_LOCK_KEY = 0x7665_6374
+MIGRATION_LOCK_KEY = 0x7665_6375
+
+
+class VectorIndexManager:
+    """Create, tune and rebuild the indexes of the ``document_chunks`` table.
+
+    The HNSW index on ``embedding`` uses the operator class of the configured
+    distance metric and is built with ``hnsw_m`` and ``hnsw_ef_construction``.
+    With ``quantization`` it indexes a ``halfvec`` or binary projection of the
+    column instead, and the index of the previous mode is dropped once the
+    new one is valid.
+    Per-document filters and deletes use the ``(document_id, chunk_index)``
+    unique index that comes with the table, and a GIN index on
+    ``search_vector`` serves the full-text side of hybrid search. Indexes are built
+    ``CONCURRENTLY`` so ingestion and questions keep running meanwhile.
+
+    Also migrates the chunks stored by the former LangChain PGVector tables.
+    """
+
+    def __init__(
+        self, engine: AsyncEngine | None = None, config: PGVectorConfig | None = None
+    ) -> None:
+        self.engine = engine or default_engine
+        self.config = config or settings.pgvector
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def hnsw_index(self) -> str:
+        return HNSW_INDEXES[self.config.quantization]
+
+    @property
+    def hnsw_definition(self) -> str:
+        expression, _, _, operator_class = search_terms(self.config)
+        if expression != "embedding":
+            expression = f"({expression})"
+        return (
+            f"USING hnsw ({expression} {operator_class}) "
+            f"WITH (m = {int(self.config.hnsw_m)}, "
+            f"ef_construction = {int(self.config.hnsw_ef_construction)})"
+        )
+
+    async def migrate_legacy_chunks(self) -> int:
+        """Copy the chunks of the ``pgvector.table_name`` LangChain collection.
+
+        Runs at startup before the ingestion workers. The collection is renamed
+        to ``<name>_migrated`` in the same transaction, so the copy happens
+        once and the old rows stay available until dropped by hand.
+        """
+        async with self.engine.begin() as conn:
+            if (
+                await conn.scalar(
+                    text("SELECT to_regclass(:table)"), {"table": LEGACY_EMBEDDING_TABLE}
+                )
+                is None
+            ):
+                return 0
+
+            await conn.execute(text(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_KEY})"))
+            collection = self.config.table_name
+            exists = await conn.scalar(
+                text(f"SELECT 1 FROM {LEGACY_COLLECTION_TABLE} WHERE name = :collection LIMIT 1"),
+                {"collection": collection},
+            )
+            if not exists:
+                return 0
+
+            legacy_count = await conn.scalar(
+                text(
+                    f"SELECT count(*) FROM {LEGACY_EMBEDDING_TABLE} e "
+                    f"JOIN {LEGACY_COLLECTION_TABLE} c ON c.uuid = e.collection_id "
+                    "WHERE c.name = :collection"
+                ),
+                {"collection": collection},
+            )
+
+            result = await conn.execute(text(MIGRATE_LEGACY_SQL), {"collection": collection})
+            migrated = result.rowcount or 0
+            await conn.execute(
+                text(
+                    f"UPDATE {LEGACY_COLLECTION_TABLE} SET name = name || '_migrated' "
+                    "WHERE name = :collection"
+                ),
+                {"collection": collection},
+            )
+
+        logger.info(
+            f"Migrated {migrated} of {legacy_count} chunks from the LangChain collection "
+            f"{collection} into {CHUNK_TABLE}"
+        )
+        return migrated
+
+    async def start(self) -> None:
+        """Ensure the indexes in the background so startup is not blocked by a build."""
+        if self.config.manage_indexes and self._task is None:
+            self._task = asyncio.create_task(self._ensure_in_background(), name="vector-indexes")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def ensure_indexes(self, drop_stale: bool = True) -> bool:
+        """Create missing or invalid indexes. Return False if another process holds the lock.
+
+        With ``drop_stale`` the HNSW indexes of other quantization modes are
+        dropped after the current one is built.
+        """
+        async with self._autocommit() as conn:
+            if not await conn.scalar(text(f"SELECT pg_try_advisory_lock({INDEX_LOCK_KEY})")):
+                logger.info("Another process is managing the vector indexes")
+                return False
+            try:
+                await self._create_index(conn, LEXICAL_INDEX, "USING gin (search_vector)")
+                await self._create_index(conn, self.hnsw_index, self.hnsw_definition)
+                if drop_stale:
+                    await self._drop_stale_indexes(conn)
+            finally:
+                await conn.execute(text(f"SELECT pg_advisory_unlock({INDEX_LOCK_KEY})"))
+        return True
+
+    async def rebuild(self) -> None:
+        """Rebuild the indexes without blocking writes, applying the current HNSW settings.
+
+        ``REINDEX`` would keep the old ``m``/``ef_construction``, so the HNSW
+        index is built under a temporary name and swapped in.
+        """
+        async with self._autocommit() as conn:
+            await conn.execute(text(f"SELECT pg_advisory_lock({INDEX_LOCK_KEY})"))
+            try:
+                hnsw_index = self.hnsw_index
+                temporary = f"{hnsw_index}_new"
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {temporary}"))
+                logger.info(f"Building {temporary} {self.hnsw_definition}")
+                await conn.execute(
+                    text(
+                        f"CREATE INDEX CONCURRENTLY {temporary} "
+                        f"ON {CHUNK_TABLE} {self.hnsw_definition}"
+                    )
+                )
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {hnsw_index}"))
+                await conn.execute(text(f"ALTER INDEX {temporary} RENAME TO {hnsw_index}"))
+                await conn.execute(text(f"REINDEX INDEX CONCURRENTLY {DOCUMENT_INDEX}"))
+                if await self._index_valid(conn, LEXICAL_INDEX):
+                    await conn.execute(text(f"REINDEX INDEX CONCURRENTLY {LEXICAL_INDEX}"))
+                else:
+                    await self._create_index(conn, LEXICAL_INDEX, "USING gin (search_vector)")
+            finally:
+                await conn.execute(text(f"SELECT pg_advisory_unlock({INDEX_LOCK_KEY})"))
+
+        logger.info("Vector indexes rebuilt")
+
+    async def status(self) -> list[dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    text(
+                        """
+                        SELECT
+                            c.relname AS name,
+                            i.indisvalid AS valid,
+                            pg_size_pretty(pg_relation_size(c.oid)) AS size,
+                            pg_get_indexdef(c.oid) AS definition
+                        FROM pg_index i
+                        JOIN pg_class c ON c.oid = i.indexrelid
+                        WHERE i.indrelid = to_regclass(:table)
+                        ORDER BY c.relname
+                        """
+                    ),
+                    {"table": CHUNK_TABLE},
+                )
+            ).mappings()
+            return [dict(row) for row in rows]
+
+    async def check_query_plans(self) -> list[str]:
+        """EXPLAIN the store's queries and report those that cannot use an index.
+
+        Sequential scans are disabled for the check, so a plan that still scans
+        the table means the expected index is missing or does not match the
+        query. The planner may legitimately pick a sequential scan on a small
+        table, which is why the normal cost model is not used here.
+        """
+        dimension = int(self.config.embedding_dimension)
+        vector = "[" + ",".join(["0.1"] * dimension) + "]"
+        expression, query_expression, operator, _ = search_terms(self.config)
+
+        # Mesmas consultas que o PGVectorService executa, com o índice esperado
+        queries: dict[str, tuple[str, str, dict[str, Any]]] = {
+            "cross-document search": (
+                self.hnsw_index,
+                f"SELECT id FROM {CHUNK_TABLE} "
+                f"ORDER BY {expression} {operator} {query_expression} LIMIT 5",
+                {"embedding": vector},
+            ),
+            "document filter": (
+                DOCUMENT_INDEX,
+                f"SELECT id FROM {CHUNK_TABLE} WHERE document_id = CAST(:document_id AS integer)",
+                {"document_id": 1},
+            ),
+            "full-text search": (
+                LEXICAL_INDEX,
+                f"SELECT id FROM {CHUNK_TABLE} WHERE search_vector @@ {TSQUERY_SQL}",
+                {"query": "contrato"},
+            ),
+        }
+
+        problems = []
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, (expected_index, query, params) in queries.items():
+                plan = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {query}"), params)
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                nodes = list(_plan_nodes(plan[0]["Plan"]))
+                used = sorted({node["Index Name"] for node in nodes if "Index Name" in node})
+
+                if any(
+                    node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == CHUNK_TABLE
+                    for node in nodes
+                ):
+                    problems.append(f"{name} falls back to a sequential scan")
+                elif expected_index not in used:
+                    problems.append(
+                        f"{name} uses {', '.join(used) or 'no index'} instead of {expected_index}"
+                    )
+                else:
+                    logger.info(f"{name} uses {', '.join(used)}")
+        return problems
+
+    async def _ensure_in_background(self) -> None:
+        try:
+            await self.ensure_indexes()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to ensure vector indexes: {e}")
+
+    async def _drop_stale_indexes(self, conn: AsyncConnection) -> None:
+        for name in HNSW_INDEXES.values():
+            if name != self.hnsw_index and await self._index_valid(conn, name) is not None:
+                logger.info(f"Dropping {name}, built for another quantization mode")
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    async def _create_index(self, conn: AsyncConnection, name: str, definition: str) -> None:
+        valid = await self._index_valid(conn, name)
+        if valid:
+            return
+        if valid is False:
+            # Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido
+            logger.warning(f"Dropping invalid index {name}")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        logger.info(f"Creating index {name} on {CHUNK_TABLE}")
+        await conn.execute(
+            text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {CHUNK_TABLE} {definition}")
+        )
+
+    @staticmethod
+    async def _index_valid(conn: AsyncConnection, name: str) -> bool | None:
+        """Return whether the index is valid, or None if it does not exist."""
+        return await conn.scalar(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+            {"name": name},
+        )
+
+    @asynccontextmanager
+    async def _autocommit(self) -> AsyncGenerator[AsyncConnection]:
+        # Operações CONCURRENTLY não podem rodar dentro de uma transação
+        async with self.engine.connect() as conn:
+            yield await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _plan_nodes(node: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+vector_indexes = VectorIndexManager()
+
+
+async def _main() -> int:
+    parser = argparse.ArgumentParser(description="Manage the pgvector indexes")
+    parser.add_argument("command", choices=["status", "ensure", "rebuild", "check", "migrate"])
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate":
+            await vector_indexes.migrate_legacy_chunks()
+        elif args.command == "ensure":
+            await vector_indexes.ensure_indexes()
+        elif args.command == "rebuild":
+            await vector_indexes.rebuild()
+        elif args.command == "check":
+            problems = await vector_indexes.check_query_plans()
+            for problem in problems:
+                logger.error(problem)
+            return 1 if problems else 0
+
+        for index in await vector_indexes.status():
+            state = "valid" if index["valid"] else "INVALID"
+            print(f"{index['name']:<45} {state:<8} {index['size']:>10}  {index['definition']}")
+        return 0
+    finally:
+        await default_engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -1,152 +1,480 @@
 from __future__ import annotations
 
-import asyncio
 from typing import Any
 
-from langchain_community.vectorstores import PGVector
-from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from loguru import logger
-
-from app.core.config import settings
-
-
-class LangChainPGVectorService:
-    def __init__(self, embedding_function: Embeddings) -> None:
-        self.table_name = settings.pgvector.table_name
-        self.embedding_dimension = settings.pgvector.embedding_dimension
-        self.distance_metric = settings.pgvector.distance_metric
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import PGVectorConfig, SearchMode, settings
+from app.core.db import engine as default_engine
+from app.core.vector_cache import DocumentVectorCache, document_vector_cache
+from app.core.vector_index import CHUNK_TABLE, DISTANCE_OPERATORS, TSQUERY_SQL, search_terms
+
+
+def to_vector_literal(embedding: list[float]) -> str:
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
+class PGVectorService:
+    """Async pgvector store running on the application's asyncpg engine.
+
+    Chunks live in ``document_chunks``, keyed by an integer ``document_id``
+    foreign key and ``chunk_index``, so per-document filters and deletes are
+    lookups on the ``(document_id, chunk_index)`` unique index. Inserts send
+    every chunk of a document in one ``unnest`` statement and searches are a
+    single parameterized query, so nothing blocks the event loop.
+
+    With ``quantization`` the cross-document search walks the compact index
+    for ``limit * rerank_oversample`` candidates and re-ranks them exactly
+    with the full-precision vectors.
+
+    When the vector cache is enabled, per-document searches run in NumPy over
+    the document's cached embedding matrix instead of querying Postgres.
+
+    The ``hybrid`` search mode also ranks chunks by full-text match and fuses
+    both rankings with reciprocal-rank fusion in the same statement.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        engine: AsyncEngine | None = None,
+        config: PGVectorConfig | None = None,
+        vector_cache: DocumentVectorCache | None = None,
+    ) -> None:
+        self.config = config or settings.pgvector
+        self.vector_cache = vector_cache or document_vector_cache
+        self.embedding_dimension = self.config.embedding_dimension
+        self.distance_metric = self.config.distance_metric
+        self.distance_operator = DISTANCE_OPERATORS[self.distance_metric]
         self.embedding_function = embedding_function
-
-        async_url = settings.database.url
-        self.connection_string = async_url.replace("postgresql+asyncpg://", "postgresql://")
-
-        self.vector_store: PGVector | None = None
-        self._initialized = False
-
-    async def initialize(self) -> None:
-        if self._initialized:
+        self.engine = engine or default_engine
+
+    async def add_document_chunks(
+        self,
+        document_id: int,
+        chunks: list[str],
+        embeddings: list[list[float]] | None = None,
+    ) -> None:
+        """Store chunks of a document, embedding them unless ``embeddings`` is given."""
+        if not chunks:
             return
 
-        def _create_pgvector() -> PGVector:
-            from langchain_community.vectorstores.pgvector import DistanceStrategy
-
-            return PGVector(
-                connection_string=self.connection_string,
-                embedding_function=self.embedding_function,
-                collection_name=self.table_name,
-                distance_strategy=DistanceStrategy.COSINE,
-                pre_delete_collection=False,
-            )
-
-        self.vector_store = await asyncio.get_event_loop().run_in_executor(None, _create_pgvector)
-
-        self._initialized = True
-        logger.info(f"LangChain PGVector initialized with table: {self.table_name}")
-
-    async def add_document_chunks(self, document_id: int, chunks: list[str]) -> None:
-        await self.initialize()
+        if embeddings is None:
+            embeddings = await self.embedding_function.aembed_documents(chunks)
+
+        insert_sql = f"""
+            INSERT INTO {CHUNK_TABLE} (document_id, chunk_index, content, embedding)
+            SELECT
+                CAST(:document_id AS integer),
+                chunk.ordinality - 1,
+                chunk.content,
+                CAST(chunk.embedding AS vector)
+            FROM unnest(
+                CAST(:contents AS text[]),
+                CAST(:embeddings AS text[])
+            ) WITH ORDINALITY AS chunk(content, embedding, ordinality)
+        """
 
-        documents = []
-        for chunk_id, chunk_text in enumerate(chunks):
-            doc = Document(
-                page_content=chunk_text,
-                metadata={
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text(insert_sql),
+                {
                     "document_id": document_id,
-                    "chunk_id": chunk_id,
-                    "source": f"document_{document_id}_chunk_{chunk_id}",
+                    "contents": chunks,
+                    "embeddings": [to_vector_literal(embedding) for embedding in embeddings],
                 },
             )
-            documents.append(doc)
 
-        def _add_documents() -> list[str]:
-            if self.vector_store is None:
-                raise RuntimeError("Vector store not initialized")
-            return self.vector_store.add_documents(documents)
+        # Depois do commit: cargas concorrentes ainda em andamento são descartadas
+        self.vector_cache.invalidate(document_id)
+        logger.info(f"Added {len(chunks)} chunks for document {document_id}")
 
-        await asyncio.get_event_loop().run_in_executor(None, _add_documents)
+    async def search_similar(
+        self,
+        query: str,
+        document_id: int | None = None,
+        limit: int = 5,
+        search_mode: SearchMode | None = None,
+    ) -> list[dict]:
+        query_embedding = await self.embedding_function.aembed_query(query)
+        if (search_mode or self.config.search_mode) == "hybrid":
+            return await self.search_hybrid(query, query_embedding, document_id, limit)
+        return await self.search_by_vector(query_embedding, document_id, limit)
+
+    async def search_hybrid(
+        self,
+        query: str,
+        embedding: list[float],
+        document_id: int | None = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Fuse the vector and full-text rankings with reciprocal-rank fusion.
 
-        logger.info(f"Added {len(chunks)} chunks for document {document_id} using LangChain")
+        Each side contributes its top ``hybrid_candidates`` chunks and a chunk
+        scores ``sum(1 / (rrf_k + rank))`` over the rankings it appears in.
+        Exact identifiers such as invoice or CNPJ numbers are found by the
+        full-text side even when their embedding is not close to the question.
+        """
+        distance = f"c.embedding {self.distance_operator} CAST(:embedding AS vector)"
+        candidates = max(self.config.hybrid_candidates, limit)
+        vector_filter, lexical_filter = "", ""
+        if document_id is not None:
+            vector_filter = "WHERE c.document_id = CAST(:document_id AS integer)"
+            lexical_filter = "AND c.document_id = CAST(:document_id AS integer)"
+            vector_order = f"({distance}) + 0"
+        else:
+            expression, query_expression, operator, _ = search_terms(self.config)
+            vector_order = f"{expression} {operator} {query_expression}"
+
+        search_sql = f"""
+            WITH vector_ranked AS (
+                SELECT c.id, row_number() OVER (ORDER BY c.distance) AS rank
+                FROM (
+                    SELECT c.id, {distance} AS distance
+                    FROM {CHUNK_TABLE} c
+                    {vector_filter}
+                    ORDER BY {vector_order}
+                    LIMIT :candidates
+                ) c
+            ),
+            lexical_ranked AS (
+                SELECT c.id, row_number() OVER (ORDER BY c.text_rank DESC) AS rank
+                FROM (
+                    SELECT c.id, ts_rank_cd(c.search_vector, q.query) AS text_rank
+                    FROM {CHUNK_TABLE} c, (SELECT {TSQUERY_SQL} AS query) q
+                    WHERE c.search_vector @@ q.query {lexical_filter}
+                    ORDER BY text_rank DESC
+                    LIMIT :candidates
+                ) c
+            ),
+            fused AS (
+                SELECT ranked.id, sum(1.0 / (:rrf_k + ranked.rank)) AS score
+                FROM (
+                    SELECT id, rank FROM vector_ranked
+                    UNION ALL
+                    SELECT id, rank FROM lexical_ranked
+                ) ranked
+                GROUP BY ranked.id
+            )
+            SELECT
+                c.content,
+                c.document_id,
+                c.chunk_index,
+                {distance} AS distance,
+                f.score
+            FROM fused f
+            JOIN {CHUNK_TABLE} c ON c.id = f.id
+            ORDER BY f.score DESC, distance
+            LIMIT :limit
+        """
+        params: dict[str, Any] = {
+            "embedding": to_vector_literal(embedding),
+            "query": query,
+            "candidates": candidates,
+            "rrf_k": self.config.rrf_k,
+            "limit": limit,
+        }
+        if document_id is not None:
+            params["document_id"] = document_id
 
-    async def search_similar(
-        self, query: str, document_id: int | None = None, limit: int = 5
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                {"ef_search": str(max(self.config.hnsw_ef_search, candidates))},
+            )
+            rows = (await conn.execute(text(search_sql), params)).all()
+
+        results = [
+            {
+                "document_id": row.document_id,
+                "chunk_id": row.chunk_index,
+                "content": row.content,
+                "distance": row.distance,
+                "relevance_score": 1 - row.distance,
+                "rrf_score": float(row.score),
+            }
+            for row in rows
+        ]
+
+        logger.info(f"Found {len(results)} chunks with hybrid search")
+        return results
+
+    async def search_by_vector(
+        self, embedding: list[float], document_id: int | None = None, limit: int = 5
     ) -> list[dict]:
-        await self.initialize()
+        if document_id is not None and self.vector_cache.enabled:
+            cached = await self.vector_cache.get(
+                document_id, lambda: self._load_document_vectors(document_id)
+            )
+            if cached is not None:
+                results = [
+                    {
+                        "document_id": document_id,
+                        **result,
+                        "relevance_score": 1 - result["distance"],
+                    }
+                    for result in cached.search(embedding, self.distance_metric, limit)
+                ]
+                logger.info(f"Found {len(results)} similar chunks in the vector cache")
+                return results
+
+        distance = f"c.embedding {self.distance_operator} CAST(:embedding AS vector)"
+        params: dict[str, Any] = {"embedding": to_vector_literal(embedding), "limit": limit}
+        ef_search = self.config.hnsw_ef_search
 
-        filter_kwargs = {}
         if document_id is not None:
-            filter_kwargs["filter"] = {"document_id": document_id}
+            # O HNSW filtra depois de buscar ef_search candidatos e devolveria
+            # poucos chunks de um documento pequeno: "+ 0" impede o uso do índice
+            # ANN e a busca passa a ser exata sobre o índice de document_id.
+            search_sql = f"""
+                SELECT c.content, c.document_id, c.chunk_index, {distance} AS distance
+                FROM {CHUNK_TABLE} c
+                WHERE c.document_id = CAST(:document_id AS integer)
+                ORDER BY ({distance}) + 0
+                LIMIT :limit
+            """
+            params["document_id"] = document_id
+        elif self.config.quantization != "none":
+            expression, query_expression, operator, _ = search_terms(self.config)
+            candidates = limit * max(self.config.rerank_oversample, 1)
+            # O índice só devolve até ef_search vizinhos
+            ef_search = max(ef_search, candidates)
+            search_sql = f"""
+                WITH candidates AS (
+                    SELECT c.content, c.document_id, c.chunk_index, c.embedding
+                    FROM {CHUNK_TABLE} c
+                    ORDER BY {expression} {operator} {query_expression}
+                    LIMIT :candidates
+                )
+                SELECT c.content, c.document_id, c.chunk_index, {distance} AS distance
+                FROM candidates c
+                ORDER BY distance
+                LIMIT :limit
+            """
+            params["candidates"] = candidates
+        else:
+            search_sql = f"""
+                SELECT c.content, c.document_id, c.chunk_index, {distance} AS distance
+                FROM {CHUNK_TABLE} c
+                ORDER BY distance
+                LIMIT :limit
+            """
+
+        async with self.engine.begin() as conn:
+            # Vale só para esta transação, sem vazar para outras conexões do pool
+            await conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                {"ef_search": str(ef_search)},
+            )
+            rows = (await conn.execute(text(search_sql), params)).all()
+
+        results = [
+            {
+                "document_id": row.document_id,
+                "chunk_id": row.chunk_index,
+                "content": row.content,
+                "distance": row.distance,
+                "relevance_score": 1 - row.distance,
+            }
+            for row in rows
+        ]
+
+        logger.info(f"Found {len(results)} similar chunks")
+        return results
+
+    async def search_document_batch(
+        self, document_id: int, embeddings: list[list[float]], limit: int = 5
+    ) -> list[list[dict]]:
+        """Run one exact per-document search for each embedding in a single statement.
 
-        def _search() -> Any:
-            if self.vector_store is None:
-                raise RuntimeError("Vector store not initialized")
-            return self.vector_store.similarity_search_with_score(query, k=limit, **filter_kwargs)
+        Returns one result list per embedding, in input order. Served from the
+        vector cache when it holds the document.
+        """
+        if not embeddings:
+            return []
 
-        docs_and_scores = await asyncio.get_event_loop().run_in_executor(None, _search)
+        if self.vector_cache.enabled:
+            cached = await self.vector_cache.get(
+                document_id, lambda: self._load_document_vectors(document_id)
+            )
+            if cached is not None:
+                return [
+                    [
+                        {
+                            "document_id": document_id,
+                            **result,
+                            "relevance_score": 1 - result["distance"],
+                        }
+                        for result in cached.search(embedding, self.distance_metric, limit)
+                    ]
+                    for embedding in embeddings
+                ]
+
+        distance = f"c.embedding {self.distance_operator} CAST(q.embedding AS vector)"
+        search_sql = f"""
+            SELECT q.ordinality - 1 AS query_index, r.*
+            FROM unnest(CAST(:embeddings AS text[])) WITH ORDINALITY AS q(embedding, ordinality)
+            CROSS JOIN LATERAL (
+                SELECT c.content, c.document_id, c.chunk_index, {distance} AS distance
+                FROM {CHUNK_TABLE} c
+                WHERE c.document_id = CAST(:document_id AS integer)
+                ORDER BY ({distance}) + 0
+                LIMIT :limit
+            ) r
+            ORDER BY q.ordinality, r.distance
+        """
 
-        results = []
-        for doc, score in docs_and_scores:
-            results.append(
+        async with self.engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    text(search_sql),
+                    {
+                        "embeddings": [to_vector_literal(embedding) for embedding in embeddings],
+                        "document_id": document_id,
+                        "limit": limit,
+                    },
+                )
+            ).all()
+
+        results: list[list[dict]] = [[] for _ in embeddings]
+        for row in rows:
+            results[row.query_index].append(
                 {
-                    "document_id": doc.metadata.get("document_id"),
-                    "chunk_id": doc.metadata.get("chunk_id"),
-                    "content": doc.page_content,
-                    "distance": score,
-                    "relevance_score": 1 - score,
+                    "document_id": row.document_id,
+                    "chunk_id": row.chunk_index,
+                    "content": row.content,
+                    "distance": row.distance,
+                    "relevance_score": 1 - row.distance,
                 }
             )
 
-        logger.info(f"Found {len(results)} similar chunks using LangChain")
+        logger.info(f"Ran {len(embeddings)} searches on document {document_id} in one query")
         return results
 
-    async def delete_document_chunks(self, document_id: int) -> int:
-        await self.initialize()
-
-        from sqlalchemy import create_engine, text
+    async def _load_document_vectors(
+        self, document_id: int
+    ) -> list[tuple[int, str, list[float]]] | None:
+        max_chunks = self.vector_cache.config.max_document_chunks
+        async with self.engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    text(
+                        "SELECT chunk_index, content, CAST(embedding AS real[]) AS embedding "
+                        f"FROM {CHUNK_TABLE} WHERE document_id = CAST(:document_id AS integer) "
+                        "ORDER BY chunk_index LIMIT :limit"
+                    ),
+                    {"document_id": document_id, "limit": max_chunks + 1},
+                )
+            ).all()
+
+        if len(rows) > max_chunks:
+            return None
+        return [(row.chunk_index, row.content, row.embedding) for row in rows]
+
+    async def chunk_embeddings(
+        self, keys: list[tuple[int, int]]
+    ) -> dict[tuple[int, int], list[float]]:
+        """Embeddings of the given ``(document_id, chunk_index)`` pairs."""
+        if not keys:
+            return {}
+
+        embeddings_sql = f"""
+            SELECT c.document_id, c.chunk_index, CAST(c.embedding AS real[]) AS embedding
+            FROM unnest(CAST(:document_ids AS integer[]), CAST(:chunk_indexes AS integer[]))
+                AS k(document_id, chunk_index)
+            JOIN {CHUNK_TABLE} c
+                ON c.document_id = k.document_id AND c.chunk_index = k.chunk_index
+        """
 
-        engine = create_engine(self.connection_string)
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                text(embeddings_sql),
+                {
+                    "document_ids": [key[0] for key in keys],
+                    "chunk_indexes": [key[1] for key in keys],
+                },
+            )
+            return {(row.document_id, row.chunk_index): row.embedding for row in rows}
 
-        with engine.begin() as conn:
-            result = conn.execute(
+    async def delete_document_chunks(self, document_id: int) -> int:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
                 text(
-                    f"DELETE FROM {self.table_name} WHERE cmetadata->>'document_id' = :document_id"
+                    f"DELETE FROM {CHUNK_TABLE} WHERE document_id = CAST(:document_id AS integer)"
                 ),
-                {"document_id": str(document_id)},
+                {"document_id": document_id},
             )
             deleted_count = result.rowcount or 0
 
+        self.vector_cache.invalidate(document_id)
         logger.info(f"Deleted {deleted_count} chunks for document {document_id}")
         return deleted_count
 
-    async def get_stats(self) -> dict[str, Any]:
-        await self.initialize()
-
-        from sqlalchemy import create_engine, text
+    async def copy_document_chunks(self, source_document_id: int, target_document_id: int) -> int:
+        """Duplicate the chunks and embeddings of one document under another id."""
+        copy_sql = f"""
+            INSERT INTO {CHUNK_TABLE} (document_id, chunk_index, content, embedding)
+            SELECT CAST(:target_id AS integer), chunk_index, content, embedding
+            FROM {CHUNK_TABLE}
+            WHERE document_id = CAST(:source_id AS integer)
+            ON CONFLICT (document_id, chunk_index) DO NOTHING
+        """
 
-        engine = create_engine(self.connection_string)
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                text(copy_sql),
+                {"source_id": source_document_id, "target_id": target_document_id},
+            )
+            copied_count = result.rowcount or 0
+
+        self.vector_cache.invalidate(target_document_id)
+        logger.info(
+            f"Copied {copied_count} chunks from document {source_document_id} "
+            f"to document {target_document_id}"
+        )
+        return copied_count
+
+    async def content_version(self, document_id: int | None = None) -> str:
+        """Cheap fingerprint of the chunks a question can retrieve.
+
+        Rewriting a document's chunks assigns new ids, so count and highest id
+        change on re-ingestion and deletion. Across all documents only the
+        highest id is read, which misses deletions; those rely on explicit
+        invalidation and the cache TTL.
+        """
+        async with self.engine.connect() as conn:
+            if document_id is None:
+                max_id = await conn.scalar(text(f"SELECT max(id) FROM {CHUNK_TABLE}"))
+                return f"all:{max_id or 0}"
+            row = (
+                await conn.execute(
+                    text(
+                        f"SELECT count(*) AS chunks, max(id) AS max_id FROM {CHUNK_TABLE} "
+                        "WHERE document_id = CAST(:document_id AS integer)"
+                    ),
+                    {"document_id": document_id},
+                )
+            ).one()
+        return f"{row.chunks}:{row.max_id or 0}"
 
+    async def get_stats(self) -> dict[str, Any]:
         stats_sql = f"""
-            SELECT 
-                COUNT(*) as total_chunks,
-                COUNT(DISTINCT cmetadata->>'document_id') as total_documents
-            FROM {self.table_name};
+            SELECT COUNT(*) AS total_chunks, COUNT(DISTINCT document_id) AS total_documents
+            FROM {CHUNK_TABLE}
         """
 
-        with engine.begin() as conn:
-            result = conn.execute(text(stats_sql))
-            row = result.fetchone()
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(text(stats_sql))).one()
 
         return {
-            "total_chunks": row.total_chunks if row else 0,
-            "total_documents": row.total_documents if row else 0,
-            "table_name": self.table_name,
+            "total_chunks": row.total_chunks,
+            "total_documents": row.total_documents,
+            "table_name": CHUNK_TABLE,
             "embedding_dimension": self.embedding_dimension,
         }
 
     async def close(self) -> None:
         pass
-
-    def as_retriever(self, **kwargs: Any) -> Any:
-        if self.vector_store is None:
-            raise RuntimeError("Vector store not initialized")
-        return self.vector_store.as_retriever(**kwargs)
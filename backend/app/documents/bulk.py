@@ -0,0 +1,300 @@
+"""Ingestão em lote: OCR, chunking e embedding em pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import zipfile
+from collections.abc import AsyncIterator
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+from loguru import logger
+
+from app.core.config import settings
+from app.core.db import get_db_session
+from app.documents.schemas import BulkFileResult, BulkFileStatus, BulkIngestionResult
+from app.documents.service import DocumentService
+
+
+@dataclass
+class _StoredFile:
+    index: int
+    file_name: str
+    file_path: Path
+    content_hash: str
+
+
+@dataclass
+class _PendingChunks:
+    index: int
+    file_name: str
+    document_id: int
+    chunks: list[str]
+    started_at: float
+
+
+class BulkIngestionPipeline:
+    """Ingest many files in one request.
+
+    Files are extracted one after another (each PDF is already OCRed page-parallel)
+    while a concurrent stage embeds the chunks of finished documents. Chunks from
+    several documents are grouped into the same embedding call, so embedding for
+    document N overlaps with OCR for document N+1.
+
+    The request waits for the whole run and answers with the per-file summary.
+    The pipeline state (stored files, pending chunks, shared embedding batches)
+    lives in this process only; a durable job would have to split it back into
+    per-document jobs and lose the cross-document batching. Clients that cannot
+    hold the connection use ``/documents/upload``, which queues one job per file.
+    """
+
+    def __init__(self, service: DocumentService) -> None:
+        self.service = service
+        self.rag_processor = service.rag_processor
+        self.batch_size = settings.bulk.embedding_batch_size
+
+    async def run(self, uploads: list[UploadFile]) -> BulkIngestionResult:
+        start_time = time.perf_counter()
+        results: dict[int, BulkFileResult] = {}
+
+        stored = await self._store_uploads(uploads, results)
+
+        queue: asyncio.Queue[_PendingChunks | None] = asyncio.Queue(
+            maxsize=settings.bulk.pipeline_depth
+        )
+        embedder = asyncio.create_task(self._embedding_stage(queue, results))
+        try:
+            for stored_file in stored:
+                pending = await self._extraction_stage(stored_file, results)
+                if pending:
+                    await queue.put(pending)
+            await queue.put(None)
+            await embedder
+        finally:
+            embedder.cancel()
+
+        files = [results[index] for index in sorted(results)]
+        failed = sum(1 for result in files if result.status == BulkFileStatus.FAILED)
+        logger.info(f"Bulk ingestion finished: {len(files) - failed} succeeded, {failed} failed")
+
+        return BulkIngestionResult(
+            files=files,
+            succeeded=len(files) - failed,
+            failed=failed,
+            processing_time_ms=int((time.perf_counter() - start_time) * 1000),
+        )
+
+    async def _store_uploads(
+        self, uploads: list[UploadFile], results: dict[int, BulkFileResult]
+    ) -> list[_StoredFile]:
+        """Save every upload, expanding zip archives into their supported members.
+
+        The file limit is checked against every upload and archive member before
+        anything is written, so a rejected request leaves nothing in storage.
+        """
+        stored: list[_StoredFile] = []
+        index = 0
+
+        def _failed(file_name: str, error: Exception) -> None:
+            nonlocal index
+            results[index] = BulkFileResult(
+                file_name=file_name,
+                status=BulkFileStatus.FAILED,
+                error=f"{type(error).__name__}: {error}",
+            )
+            index += 1
+
+        async def _store(file_name: str, chunks: AsyncIterator[bytes]) -> None:
+            nonlocal index
+            try:
+                file_ext = self.service.validate_file_name(file_name)
+                file_path, content_hash = await self.service.store_stream(chunks, file_ext)
+            except ValueError as e:
+                _failed(file_name, e)
+                return
+            stored.append(_StoredFile(index, file_name, file_path, content_hash))
+            index += 1
+
+        with ExitStack() as stack:
+            # Abre os zips antes de gravar qualquer arquivo para conferir o limite
+            archives: dict[int, tuple[zipfile.ZipFile, list[zipfile.ZipInfo]]] = {}
+            broken: dict[int, zipfile.BadZipFile] = {}
+            for position, upload in enumerate(uploads):
+                if Path(upload.filename or "").suffix.lower() != ".zip":
+                    continue
+                try:
+                    archive = await asyncio.get_event_loop().run_in_executor(
+                        None, zipfile.ZipFile, upload.file
+                    )
+                except zipfile.BadZipFile as e:
+                    broken[position] = e
+                    continue
+                stack.enter_context(archive)
+                archives[position] = (
+                    archive,
+                    [
+                        member
+                        for member in archive.infolist()
+                        if not member.is_dir() and not Path(member.filename).name.startswith(".")
+                    ],
+                )
+
+            total = (
+                len(uploads) - len(archives) + sum(len(members) for _, members in archives.values())
+            )
+            if total > settings.bulk.max_files:
+                raise ValueError(
+                    f"Bulk ingestion is limited to {settings.bulk.max_files} files, got {total}"
+                )
+
+            for position, upload in enumerate(uploads):
+                file_name = upload.filename or ""
+                if position in broken:
+                    _failed(file_name, broken[position])
+                elif position in archives:
+                    archive, members = archives[position]
+                    for member in members:
+                        await _store(member.filename, self._read_zip_member(archive, member))
+                else:
+                    await _store(file_name, self._read_upload(upload))
+
+        return stored
+
+    async def _extraction_stage(
+        self, stored: _StoredFile, results: dict[int, BulkFileResult]
+    ) -> _PendingChunks | None:
+        started_at = time.perf_counter()
+        document_id: int | None = None
+        try:
+            duplicate = await self.service.find_duplicate(stored.content_hash)
+            if duplicate is not None:
+                text_content = str(duplicate.text_content)
+            else:
+                pages = await self.service.extract_text(stored.file_path)
+                if pages and all(page.error for page in pages):
+                    raise ValueError(f"Text extraction failed for every page of {stored.file_name}")
+                text_content = "\n\n".join(page.text for page in pages if not page.error)
+
+            document = await self.service.create_document(
+                stored.file_name, stored.file_path, text_content, stored.content_hash
+            )
+            document_id = int(document.id)
+
+            if duplicate is not None:
+                chunks_reused = await self.rag_processor.copy_document_chunks(
+                    int(duplicate.id), document_id
+                )
+                if chunks_reused:
+                    results[stored.index] = BulkFileResult(
+                        file_name=stored.file_name,
+                        status=BulkFileStatus.DEDUPLICATED,
+                        document_id=document.id,
+                        chunks_created=chunks_reused,
+                        processing_time_ms=int((time.perf_counter() - started_at) * 1000),
+                    )
+                    return None
+
+            chunks = self.rag_processor.split_text(text_content)
+            return _PendingChunks(stored.index, stored.file_name, document_id, chunks, started_at)
+
+        except Exception as e:
+            logger.warning(f"Bulk ingestion failed for {stored.file_name}: {e}")
+            if document_id is not None:
+                await self._discard_document(document_id)
+            results[stored.index] = BulkFileResult(
+                file_name=stored.file_name,
+                status=BulkFileStatus.FAILED,
+                error=f"{type(e).__name__}: {e}",
+            )
+            return None
+
+    async def _embedding_stage(
+        self, queue: asyncio.Queue[_PendingChunks | None], results: dict[int, BulkFileResult]
+    ) -> None:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            batch: list[_PendingChunks] = []
+            if item is None:
+                finished = True
+            else:
+                batch.append(item)
+
+            # Agrupa documentos já prontos na mesma chamada de embedding
+            while not finished and not queue.empty():
+                if sum(len(pending.chunks) for pending in batch) >= self.batch_size:
+                    break
+                item = queue.get_nowait()
+                if item is None:
+                    finished = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                await self._embed_batch(batch, results)
+
+    async def _embed_batch(
+        self, batch: list[_PendingChunks], results: dict[int, BulkFileResult]
+    ) -> None:
+        try:
+            texts = [chunk for pending in batch for chunk in pending.chunks]
+            embeddings = await self.rag_processor.embed_chunks(texts)
+            logger.info(f"Embedded {len(texts)} chunks from {len(batch)} documents in one batch")
+
+            offset = 0
+            for pending in batch:
+                document_embeddings = embeddings[offset : offset + len(pending.chunks)]
+                offset += len(pending.chunks)
+                await self.rag_processor.index_chunks(
+                    pending.document_id, pending.chunks, document_embeddings
+                )
+                results[pending.index] = BulkFileResult(
+                    file_name=pending.file_name,
+                    status=BulkFileStatus.SUCCESS,
+                    document_id=pending.document_id,
+                    chunks_created=len(pending.chunks),
+                    processing_time_ms=int((time.perf_counter() - pending.started_at) * 1000),
+                )
+
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} documents failed: {e}")
+            for pending in batch:
+                # Documentos do lote já indexados antes da falha continuam valendo
+                if pending.index in results:
+                    continue
+                await self._discard_document(pending.document_id)
+                results[pending.index] = BulkFileResult(
+                    file_name=pending.file_name,
+                    status=BulkFileStatus.FAILED,
+                    error=f"{type(e).__name__}: {e}",
+                )
+
+    async def _discard_document(self, document_id: int) -> None:
+        """Remove the document of a failed file so it is not listed without chunks."""
+        try:
+            async with get_db_session() as db:
+                await self.service.delete_document(document_id, db)
+        except Exception as e:
+            logger.error(f"Could not remove document {document_id} of a failed file: {e}")
+
+    @staticmethod
+    async def _read_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+        while chunk := await upload.read(settings.app.upload_chunk_size):
+            yield chunk
+
+    @staticmethod
+    async def _read_zip_member(
+        archive: zipfile.ZipFile, member: zipfile.ZipInfo
+    ) -> AsyncIterator[bytes]:
+        loop = asyncio.get_event_loop()
+        stream = await loop.run_in_executor(None, archive.open, member)
+        try:
+            while chunk := await loop.run_in_executor(
+                None, stream.read, settings.app.upload_chunk_size
+            ):
+                yield chunk
+        finally:
+            stream.close()
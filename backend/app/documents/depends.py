@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
@@ -9,7 +10,9 @@ from app.core.db import get_db
 from app.documents.service import DocumentService
 
 
+@lru_cache(maxsize=1)
 def get_document_service() -> DocumentService:
+    """Shared document service, also used by the ingestion workers."""
     return DocumentService()
 
 
@@ -0,0 +1,145 @@
+"""Cache de embeddings no Postgres, por modelo e hash do conteúdo do chunk."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
+
+import tiktoken
+from loguru import logger
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.db import get_db_session
+from app.documents.models import EmbeddingCacheEntry
+from app.documents.schemas import EmbeddingCacheStats
+
+EmbedFunction = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+BATCH_SIZE = 1000  # hashes per lookup and rows per insert
+
+
+class EmbeddingCache:
+    """Reuse embeddings of chunks whose exact text was embedded before.
+
+    Boilerplate such as legal footers and letterheads repeats across many
+    documents. Vectors are looked up in bulk by ``(model, sha256(text))``
+    before calling the embedding API and new ones are written back. Hit
+    counters are per process; the estimated savings use the observed API
+    latency per chunk and tiktoken counts of the cached texts.
+    """
+
+    def __init__(self, enabled: bool | None = None) -> None:
+        self.enabled = settings.openai.embedding_cache_enabled if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._api_chunks = 0
+        self._api_time = 0.0
+        self._encoding: tiktoken.Encoding | None = None
+
+    @staticmethod
+    def key(chunk: str) -> str:
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+    async def embed_documents(
+        self, model: str, chunks: list[str], embed: EmbedFunction
+    ) -> list[list[float]]:
+        """Embed ``chunks`` in order, calling ``embed`` only for uncached texts."""
+        if not chunks:
+            return []
+        if not self.enabled:
+            return await self._embed_timed(embed, chunks)
+
+        keys = [self.key(chunk) for chunk in chunks]
+        cached = await self.lookup(model, sorted(set(keys)))
+
+        # Chunks repetidos dentro do mesmo lote são enviados uma única vez
+        missing: dict[str, str] = {}
+        for key, chunk in zip(keys, chunks, strict=True):
+            if key in cached:
+                self.hits += 1
+                self.tokens_saved += self._count_tokens(chunk)
+                continue
+            self.misses += 1
+            missing.setdefault(key, chunk)
+
+        if missing:
+            vectors = await self._embed_timed(embed, list(missing.values()))
+            new_entries = dict(zip(missing, vectors, strict=True))
+            await self.store(model, new_entries)
+            cached.update(new_entries)
+
+        logger.info(
+            f"Embedding cache: {len(chunks) - len(missing)} of {len(chunks)} chunks "
+            f"served without calling {model}"
+        )
+        return [cached[key] for key in keys]
+
+    async def stats(self) -> EmbeddingCacheStats:
+        lookups = self.hits + self.misses
+        ms_per_chunk = self._api_time * 1000 / self._api_chunks if self._api_chunks else 0.0
+
+        async with get_db_session() as db:
+            # Estimativa do planner: COUNT(*) varreria a tabela inteira
+            entries = await db.scalar(
+                text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = :table"),
+                {"table": EmbeddingCacheEntry.__tablename__},
+            )
+
+        return EmbeddingCacheStats(
+            enabled=self.enabled,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0,
+            entries=int(entries or 0),
+            tokens_saved=self.tokens_saved,
+            estimated_time_saved_ms=int(self.hits * ms_per_chunk),
+        )
+
+    def _count_tokens(self, chunk: str) -> int:
+        # Carregado sob demanda: o tiktoken baixa o vocabulário no primeiro uso
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return len(self._encoding.encode(chunk))
+
+    async def _embed_timed(self, embed: EmbedFunction, chunks: list[str]) -> list[list[float]]:
+        start_time = time.perf_counter()
+        vectors = await embed(chunks)
+        self._api_time += time.perf_counter() - start_time
+        self._api_chunks += len(chunks)
+        return vectors
+
+    async def lookup(self, model: str, keys: list[str]) -> dict[str, list[float]]:
+        """Return the cached vectors found for ``keys``."""
+        found: dict[str, list[float]] = {}
+        async with get_db_session() as db:
+            for start in range(0, len(keys), BATCH_SIZE):
+                result = await db.execute(
+                    select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                        EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.content_hash.in_(keys[start : start + BATCH_SIZE]),
+                    )
+                )
+                for content_hash, embedding in result:
+                    found[content_hash] = embedding.tolist()
+        return found
+
+    async def store(self, model: str, entries: dict[str, list[float]]) -> None:
+        """Insert vectors by key, keeping existing entries."""
+        rows = [
+            {"model": model, "content_hash": key, "embedding": vector}
+            for key, vector in entries.items()
+        ]
+        async with get_db_session() as db:
+            for start in range(0, len(rows), BATCH_SIZE):
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(rows[start : start + BATCH_SIZE])
+                    .on_conflict_do_nothing(constraint="uq_embedding_cache_key")
+                )
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,128 @@
+"""Fila de ingestão de documentos persistida no Postgres."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import UTC, datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import and_, func, or_, select, update
+
+from app.core.config import settings
+from app.core.db import get_db_session
+from app.documents.depends import get_document_service
+from app.documents.models import IngestionJob
+from app.documents.schemas import IngestionJobStatus
+from app.documents.service import DocumentService
+
+
+class IngestionWorkerPool:
+    """Bounded pool of background workers consuming ``ingestion_jobs``.
+
+    Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` so several app processes
+    can share the queue. A running job bumps its row every
+    ``heartbeat_interval`` seconds; one whose row has not been touched for
+    ``stale_job_timeout`` seconds is assumed to belong to a dead process and
+    is claimed again.
+    """
+
+    def __init__(self, workers: int | None = None) -> None:
+        self.workers = workers or settings.ingestion.workers
+        self.poll_interval = settings.ingestion.poll_interval
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup = asyncio.Event()
+        self._service: DocumentService | None = None
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+
+        self._service = get_document_service()
+        self._tasks = [
+            asyncio.create_task(self._run_worker(worker_id), name=f"ingestion-worker-{worker_id}")
+            for worker_id in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} ingestion workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ingestion workers stopped")
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was queued by this process."""
+        self._wakeup.set()
+
+    async def _run_worker(self, worker_id: int) -> None:
+        while True:
+            try:
+                job_id = await self._claim_next_job()
+            except Exception as e:
+                logger.error(f"Ingestion worker {worker_id} failed to claim a job: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job_id is None:
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                continue
+
+            logger.info(f"Ingestion worker {worker_id} picked up job {job_id}")
+            try:
+                if self._service is None:
+                    raise RuntimeError("Ingestion workers not started")
+                await self._service.process_ingestion_job(job_id)
+            except Exception as e:
+                logger.exception(f"Ingestion worker {worker_id} crashed on job {job_id}: {e}")
+
+    async def _claim_next_job(self) -> int | None:
+        stale_before = datetime.now(UTC) - timedelta(seconds=settings.ingestion.stale_job_timeout)
+
+        async with get_db_session() as db:
+            result = await db.execute(
+                select(IngestionJob)
+                .where(
+                    or_(
+                        IngestionJob.status == IngestionJobStatus.QUEUED,
+                        and_(
+                            IngestionJob.status == IngestionJobStatus.RUNNING,
+                            IngestionJob.updated_at < stale_before,
+                        ),
+                    )
+                )
+                .order_by(IngestionJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalar_one_or_none()
+            if job is None:
+                return None
+
+            claim = update(IngestionJob).where(IngestionJob.id == job.id)
+
+            if job.attempts >= settings.ingestion.max_attempts:
+                await db.execute(
+                    claim.values(
+                        status=IngestionJobStatus.FAILED,
+                        error=job.error or "Exceeded maximum number of attempts",
+                        finished_at=func.now(),
+                    )
+                )
+                logger.warning(f"Ingestion job {job.id} gave up after {job.attempts} attempts")
+                return None
+
+            await db.execute(
+                claim.values(
+                    status=IngestionJobStatus.RUNNING,
+                    attempts=IngestionJob.attempts + 1,
+                    started_at=func.now(),
+                )
+            )
+            return int(job.id)
+
+
+ingestion_workers = IngestionWorkerPool()
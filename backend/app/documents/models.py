@@ -1,7 +1,20 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 
+from app.core.config import settings
 from app.core.db_model import PostgresBase
 
 
@@ -11,6 +24,65 @@ class Document(PostgresBase):
     file_name = Column(String, nullable=False, index=True)
     file_path = Column(String, nullable=False)
     text_content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)
 
     def __repr__(self) -> str:
         return f"<Document(id={self.id}, file_name='{self.file_name}')>"
+
+
+class IngestionJob(PostgresBase):
+    __tablename__ = "ingestion_jobs"
+
+    file_name = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True)
+    status = Column(String, nullable=False, index=True, default="queued")
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    stage_timings = Column(JSONB, nullable=False, default=dict)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<IngestionJob(id={self.id}, status='{self.status}', stage='{self.stage}')>"
+
+
+class EmbeddingCacheEntry(PostgresBase):
+    __tablename__ = "embedding_cache"
+    __table_args__ = (UniqueConstraint("model", "content_hash", name="uq_embedding_cache_key"),)
+
+    model = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    embedding = Column(Vector(settings.pgvector.embedding_dimension), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingCacheEntry(model='{self.model}', content_hash='{self.content_hash}')>"
+
+
+class DocumentChunk(PostgresBase):
+    __tablename__ = "document_chunks"
+    __table_args__ = (
+        UniqueConstraint("document_id", "chunk_index", name="uq_document_chunks_document_chunk"),
+    )
+
+    # A constraint única começa por document_id e também atende aos filtros por documento
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    embedding = Column(Vector(settings.pgvector.embedding_dimension), nullable=False)
+    # Mesma expressão do ALTER em SCHEMA_UPGRADES; o índice GIN fica com o VectorIndexManager
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('portuguese'::regconfig, content) "
+            "|| to_tsvector('english'::regconfig, content)",
+            persisted=True,
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return f"<DocumentChunk(document_id={self.document_id}, chunk_index={self.chunk_index})>"
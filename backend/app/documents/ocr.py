@@ -0,0 +1,232 @@
+"""OCR paralelo por página usando um pool de processos."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import pytesseract
+from loguru import logger
+from PIL import Image
+
+from app.core.config import OCRConfig, settings
+from app.documents.ocr_cache import OCRCache
+from app.documents.preprocessing import PreprocessingOptions, preprocess_image
+from app.documents.schemas import OCRCacheStats, PageExtraction
+
+CACHE_EVICTION_INTERVAL = 60.0  # seconds
+
+
+# Engine tesserocr residente em cada processo do pool, criado uma única vez
+# para não recarregar os dados de idioma a cada página.
+_tesserocr_api: Any = None
+
+
+def _init_worker(config: OCRConfig) -> None:
+    if config.backend == "tesserocr":
+        _get_tesserocr_api(config)
+
+
+def _get_tesserocr_api(config: OCRConfig) -> Any:
+    global _tesserocr_api
+    if _tesserocr_api is None:
+        import tesserocr
+
+        options: dict[str, Any] = {}
+        tokens = config.tesseract_config.split()
+        for flag, value in itertools.pairwise(tokens):
+            if flag == "--psm":
+                options["psm"] = tesserocr.PSM(int(value))
+            elif flag == "--oem":
+                options["oem"] = tesserocr.OEM(int(value))
+
+        _tesserocr_api = tesserocr.PyTessBaseAPI(lang=config.language, **options)
+    return _tesserocr_api
+
+
+def _recognize(image: Image.Image, config: OCRConfig) -> str:
+    if config.backend == "tesserocr":
+        api = _get_tesserocr_api(config)
+        api.SetImage(image)
+        return str(api.GetUTF8Text())
+
+    return pytesseract.image_to_string(image, lang=config.language, config=config.tesseract_config)
+
+
+def _ocr_page(
+    page_number: int,
+    image: Image.Image,
+    config: OCRConfig,
+    cache: OCRCache | None,
+    preprocessing: PreprocessingOptions | None,
+) -> PageExtraction:
+    # Executado dentro de um processo do pool: precisa ser uma função de módulo.
+    # Exceções do pytesseract nem sempre são serializáveis, por isso o erro
+    # volta como texto em vez de ser propagado.
+    # A chave usa a imagem original, então um acerto também evita o pré-processamento.
+    timings: dict[str, float] = {}
+    try:
+        cache_key = None
+        if cache is not None:
+            config_key = f"{config.backend}|{config.language}|{config.tesseract_config}"
+            if preprocessing is not None:
+                config_key = f"{config_key}|{preprocessing.cache_key}"
+            cache_key = cache.key(image, config_key)
+            cached_text = cache.get(cache_key)
+            if cached_text is not None:
+                return PageExtraction(page_number=page_number, text=cached_text, cached=True)
+
+        if preprocessing is not None:
+            image, timings = preprocess_image(image, preprocessing)
+
+        start_time = time.perf_counter()
+        text = _recognize(image, config).strip()
+        timings["ocr"] = (time.perf_counter() - start_time) * 1000
+
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, text)
+    except Exception as e:
+        return PageExtraction(
+            page_number=page_number,
+            text="",
+            error=f"{type(e).__name__}: {e}",
+            timings_ms=timings,
+        )
+
+    return PageExtraction(page_number=page_number, text=text, timings_ms=timings)
+
+
+class OCREngine:
+    def __init__(self, config: OCRConfig | None = None) -> None:
+        self.config = config or settings.ocr
+        self.max_workers = self.config.max_workers or os.cpu_count() or 1
+        self._executor: ProcessPoolExecutor | None = None
+
+        self.cache = (
+            OCRCache(self.config.cache_dir, self.config.cache_max_bytes)
+            if self.config.cache_enabled
+            else None
+        )
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._last_eviction = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            if self.config.backend == "tesserocr" and importlib.util.find_spec("tesserocr") is None:
+                raise RuntimeError(
+                    "OCR backend 'tesserocr' requires the tesserocr package "
+                    "(install the 'tesserocr' extra)"
+                )
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.config,),
+            )
+            logger.info(
+                f"Started OCR process pool with {self.max_workers} workers "
+                f"using the {self.config.backend} backend"
+            )
+        return self._executor
+
+    async def ocr_pages(
+        self,
+        images: Sequence[Image.Image],
+        first_page: int = 1,
+        preprocessing: PreprocessingOptions | None = None,
+    ) -> list[PageExtraction]:
+        """OCR pages in parallel, returning results in page order.
+
+        Preprocessing runs inside the worker processes together with OCR. A
+        failing page is reported through ``PageExtraction.error`` instead of
+        failing the whole batch.
+        """
+        if not images:
+            return []
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        futures = [
+            loop.run_in_executor(
+                executor,
+                _ocr_page,
+                first_page + offset,
+                image,
+                self.config,
+                self.cache,
+                preprocessing,
+            )
+            for offset, image in enumerate(images)
+        ]
+        outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+        pages = []
+        for offset, outcome in enumerate(outcomes):
+            page = (
+                PageExtraction(page_number=first_page + offset, text="", error=repr(outcome))
+                if isinstance(outcome, BaseException)
+                else outcome
+            )
+            if page.error:
+                logger.warning(f"OCR failed on page {page.page_number}: {page.error}")
+            elif self.cache is not None:
+                if page.cached:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            pages.append(page)
+
+        if any(isinstance(outcome, BrokenProcessPool) for outcome in outcomes):
+            logger.error("OCR process pool is broken, it will be recreated on next use")
+            self.shutdown()
+
+        await self._maybe_evict()
+        return pages
+
+    async def cache_stats(self) -> OCRCacheStats:
+        entries, size_bytes = (
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.usage)
+            if self.cache
+            else (0, 0)
+        )
+        lookups = self.cache_hits + self.cache_misses
+
+        return OCRCacheStats(
+            enabled=self.cache is not None,
+            hits=self.cache_hits,
+            misses=self.cache_misses,
+            hit_rate=round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            entries=entries,
+            size_bytes=size_bytes,
+            max_bytes=self.config.cache_max_bytes,
+        )
+
+    async def _maybe_evict(self) -> None:
+        # Varrer o diretório é caro, então a evicção roda no máximo uma vez por intervalo
+        now = time.monotonic()
+        if self.cache is None or now - self._last_eviction < CACHE_EVICTION_INTERVAL:
+            return
+
+        self._last_eviction = now
+        removed = await asyncio.get_running_loop().run_in_executor(None, self.cache.evict)
+        if removed:
+            logger.info(f"Evicted {removed} OCR cache entries")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ocr_engine = OCREngine()
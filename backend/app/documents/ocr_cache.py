@@ -0,0 +1,84 @@
+"""Cache em disco dos resultados de OCR por imagem de página."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from uuid import uuid4
+
+from PIL import Image
+
+
+class OCRCache:
+    """On-disk OCR result cache with size-based LRU eviction.
+
+    Entries are keyed by the rasterized page pixels plus the OCR settings, so
+    re-ingesting an unchanged page skips Tesseract. The file mtime is bumped on
+    every hit and eviction removes the least recently used entries first.
+    Reads and writes are safe across the OCR worker processes.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_bytes: int) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(image: Image.Image, config_key: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{config_key}|{image.mode}|{image.width}x{image.height}|".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        # Atualiza o mtime para a ordem do LRU
+        os.utime(path)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = path.with_name(f".{path.name}.{uuid4().hex}")
+        temp_path.write_text(text, encoding="utf-8")
+        temp_path.replace(path)
+
+    def usage(self) -> tuple[int, int]:
+        """Return the number of entries and their total size in bytes."""
+        entries = [entry.stat().st_size for entry in self._entries()]
+        return len(entries), sum(entries)
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+
+        return removed
+
+    def _entries(self) -> list[Path]:
+        if not self.cache_dir.exists():
+            return []
+        return [entry for entry in self.cache_dir.glob("*/*.txt") if entry.is_file()]
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt"
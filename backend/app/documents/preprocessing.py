@@ -0,0 +1,164 @@
+"""Pré-processamento de imagens antes do OCR."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.core.config import PreprocessingConfig, settings
+
+PHOTO_FORMATS = {".jpg", ".jpeg", ".png"}
+DESKEW_STEP = 0.5  # degrees
+DESKEW_SAMPLE_SIZE = 1000  # pixels, longest side used to estimate the angle
+
+
+@dataclass(frozen=True)
+class PreprocessingOptions:
+    """Preprocessing applied to one document's page images.
+
+    Instances are sent to the OCR worker processes, so they must stay picklable.
+    """
+
+    max_dimension: int | None = None
+    target_dpi: int | None = None
+    source_dpi: float | None = None  # overrides the DPI stored in the image metadata
+    grayscale: bool = False
+    binarize: bool = False
+    deskew: bool = False
+    deskew_max_angle: float = 5.0
+
+    @property
+    def cache_key(self) -> str:
+        values = asdict(self)
+        return "|".join(f"{name}={values[name]}" for name in sorted(values))
+
+    @classmethod
+    def for_format(
+        cls,
+        file_ext: str,
+        source_dpi: float | None = None,
+        config: PreprocessingConfig | None = None,
+    ) -> PreprocessingOptions | None:
+        """Return the default options for a file extension, or None when disabled."""
+        config = config or settings.preprocessing
+        if not config.enabled:
+            return None
+
+        options = cls(
+            grayscale=config.grayscale,
+            binarize=config.binarize,
+            deskew=config.deskew,
+            deskew_max_angle=config.deskew_max_angle,
+        )
+        if file_ext in PHOTO_FORMATS:
+            # Fotos de celular não trazem DPI confiável: limita pelo maior lado
+            return replace(options, max_dimension=config.photo_max_dimension)
+
+        return replace(options, target_dpi=config.scan_target_dpi, source_dpi=source_dpi)
+
+
+def load_image(path: str, options: PreprocessingOptions | None) -> Image.Image:
+    """Open an image applying its EXIF orientation.
+
+    JPEGs larger than the target size are decoded at a reduced scale, which is
+    much cheaper than decoding at full size and resizing afterwards.
+    """
+    image = Image.open(path)
+    if options is not None and options.max_dimension:
+        longest = max(image.size)
+        if longest > options.max_dimension:
+            scale = options.max_dimension / longest
+            mode = "L" if options.grayscale else image.mode
+            image.draft(mode, (int(image.width * scale), int(image.height * scale)))
+
+    return ImageOps.exif_transpose(image)
+
+
+def preprocess_image(
+    image: Image.Image, options: PreprocessingOptions
+) -> tuple[Image.Image, dict[str, float]]:
+    """Run the enabled stages on ``image`` and return it with per-stage timings in ms."""
+    timings: dict[str, float] = {}
+
+    def _timed(stage: str, start_time: float) -> None:
+        timings[stage] = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    scale = _scale_factor(image, options)
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        _timed("resize", start_time)
+
+    if options.grayscale or options.binarize or options.deskew:
+        start_time = time.perf_counter()
+        image = image.convert("L")
+        _timed("grayscale", start_time)
+
+    if options.deskew:
+        start_time = time.perf_counter()
+        angle = _estimate_skew(image, options.deskew_max_angle)
+        if angle:
+            image = image.rotate(
+                angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255
+            )
+        _timed("deskew", start_time)
+
+    if options.binarize:
+        start_time = time.perf_counter()
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda value: 255 if value > threshold else 0)
+        _timed("binarize", start_time)
+
+    return image, timings
+
+
+def _scale_factor(image: Image.Image, options: PreprocessingOptions) -> float:
+    scale = 1.0
+    if options.max_dimension:
+        scale = min(scale, options.max_dimension / max(image.size))
+
+    source_dpi = options.source_dpi
+    if source_dpi is None and "dpi" in image.info:
+        source_dpi = float(image.info["dpi"][0])
+    if options.target_dpi and source_dpi and source_dpi > options.target_dpi:
+        scale = min(scale, options.target_dpi / source_dpi)
+
+    return scale
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    histogram = np.asarray(image.histogram()[:256], dtype=np.float64)
+    levels = np.arange(256)
+
+    weight_background = np.cumsum(histogram)
+    weight_foreground = weight_background[-1] - weight_background
+    sum_background = np.cumsum(histogram * levels)
+    mean_background = sum_background / np.maximum(weight_background, 1)
+    mean_foreground = (sum_background[-1] - sum_background) / np.maximum(weight_foreground, 1)
+
+    between_variance = (
+        weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    )
+    return int(np.argmax(between_variance))
+
+
+def _estimate_skew(image: Image.Image, max_angle: float) -> float:
+    """Find the rotation that makes text rows sharpest in the horizontal projection."""
+    sample = image.copy()
+    sample.thumbnail((DESKEW_SAMPLE_SIZE, DESKEW_SAMPLE_SIZE))
+    threshold = _otsu_threshold(sample)
+    # Texto escuro vira 255 para que a rotação preencha as bordas com 0 (sem tinta)
+    ink = sample.point(lambda value: 255 if value <= threshold else 0)
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + DESKEW_STEP / 2, DESKEW_STEP):
+        rotated = np.asarray(ink.rotate(float(angle), resample=Image.Resampling.NEAREST))
+        score = float(np.var(rotated.sum(axis=1, dtype=np.int64)))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+
+    return best_angle
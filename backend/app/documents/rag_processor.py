@@ -5,22 +5,19 @@ from __future__ import annotations
 import time
 from datetime import datetime
 
-from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from loguru import logger
 
-from app.core.config import settings
-from app.core.vector_store import LangChainPGVectorService
+from app.core.vector_store import PGVectorService
+from app.documents.embedding_cache import embedding_cache
 from app.documents.schemas import DocumentProcessingResult
+from app.rag.answer_cache import answer_cache
+from app.rag.embeddings import embedding_engine
 
 
 class DocumentRAGProcessor:
     def __init__(self) -> None:
-        api_key = settings.openai.api_key.get_secret_value()
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=api_key,
-            model=settings.openai.embedding_model,
-        )
+        self.embeddings = embedding_engine
 
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -29,22 +26,42 @@ class DocumentRAGProcessor:
             separators=["\n\n", "\n", " ", ""],
         )
 
-        self.vector_store = LangChainPGVectorService(self.embeddings)
-
-    async def process_document(
-        self, document_id: int, text_content: str
-    ) -> DocumentProcessingResult:
-        start_time = time.perf_counter()
+        self.vector_store = PGVectorService(self.embeddings)
 
+    def split_text(self, text_content: str) -> list[str]:
         chunks = self.text_splitter.split_text(text_content)
 
         if not chunks:
             raise ValueError("No chunks generated from document")
 
         logger.info(f"Generated {len(chunks)} chunks using LangChain text splitter")
+        return chunks
+
+    async def embed_chunks(self, chunks: list[str]) -> list[list[float]]:
+        return await embedding_cache.embed_documents(
+            self.embeddings.model, chunks, self.embeddings.aembed_documents
+        )
+
+    async def index_chunks(
+        self,
+        document_id: int,
+        chunks: list[str],
+        embeddings: list[list[float]] | None = None,
+    ) -> None:
+        if embeddings is None:
+            embeddings = await self.embed_chunks(chunks)
 
         # Adicionar chunks ao vector store
-        await self.vector_store.add_document_chunks(document_id, chunks)
+        await self.vector_store.add_document_chunks(document_id, chunks, embeddings)
+        answer_cache.invalidate_document(document_id)
+
+    async def process_document(
+        self, document_id: int, text_content: str
+    ) -> DocumentProcessingResult:
+        start_time = time.perf_counter()
+
+        chunks = self.split_text(text_content)
+        await self.index_chunks(document_id, chunks)
 
         processing_time = int((time.perf_counter() - start_time) * 1000)
 
@@ -56,5 +73,14 @@ class DocumentRAGProcessor:
             processed_at=datetime.now(),
         )
 
+    async def copy_document_chunks(self, source_document_id: int, target_document_id: int) -> int:
+        copied = await self.vector_store.copy_document_chunks(
+            source_document_id, target_document_id
+        )
+        answer_cache.invalidate_document(target_document_id)
+        return copied
+
     async def delete_document_chunks(self, document_id: int) -> int:
-        return await self.vector_store.delete_document_chunks(document_id)
+        deleted = await self.vector_store.delete_document_chunks(document_id)
+        answer_cache.invalidate_document(document_id)
+        return deleted
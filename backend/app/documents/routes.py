@@ -1,36 +1,85 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from loguru import logger
 
 from app.core.response_patterns import (
     APIResponse,
     ListResponse,
     create_list_response,
     create_response,
+    create_sse_event,
 )
+from app.documents.bulk import BulkIngestionPipeline
 from app.documents.depends import DatabaseDep, DocumentServiceDep
+from app.documents.ingestion import ingestion_workers
 from app.documents.schemas import (
+    BulkIngestionResult,
     DocumentDeleteResult,
     DocumentDetail,
     DocumentSummary,
-    DocumentUploadResult,
+    IngestionJobDetail,
+    ProcessingStats,
 )
+from app.documents.service import FileTooLargeError
 from app.rag.depends import RAGServiceDep
-from app.rag.schemas import QuestionRequest, RAGQuestionResponse
+from app.rag.schemas import BatchQuestionRequest, QuestionRequest, RAGQuestionResponse
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
-@router.post("/upload", response_model=APIResponse[DocumentUploadResult])
+@router.post(
+    "/upload",
+    response_model=APIResponse[IngestionJobDetail],
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def upload_document(
     file: Annotated[UploadFile, File(..., description="File to upload")],
     db: DatabaseDep,
     service: DocumentServiceDep,
-) -> APIResponse[DocumentUploadResult]:
-    result = await service.upload_and_extract(file, db)
-    return create_response(data=result, message="Document processed successfully")
+) -> APIResponse[IngestionJobDetail]:
+    try:
+        job = await service.enqueue_upload(file, db)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        ) from e
+
+    ingestion_workers.notify()
+    return create_response(data=job, message="Document queued for processing")
+
+
+@router.post("/bulk", response_model=APIResponse[BulkIngestionResult])
+async def bulk_upload_documents(
+    files: Annotated[list[UploadFile], File(..., description="Files or zip archives to ingest")],
+    service: DocumentServiceDep,
+) -> APIResponse[BulkIngestionResult]:
+    try:
+        result = await BulkIngestionPipeline(service).run(files)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    return create_response(
+        data=result,
+        message=f"Bulk ingestion finished: {result.succeeded} succeeded, {result.failed} failed",
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=APIResponse[IngestionJobDetail])
+async def get_ingestion_job(
+    job_id: int,
+    db: DatabaseDep,
+    service: DocumentServiceDep,
+) -> APIResponse[IngestionJobDetail]:
+    job = await service.get_ingestion_job(job_id, db)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+
+    return create_response(data=job, message=f"Ingestion job is {job.status}")
 
 
 @router.get("/", response_model=ListResponse[DocumentSummary])
@@ -42,6 +91,12 @@ async def list_documents(
     return create_list_response(data=documents)
 
 
+@router.get("/stats", response_model=APIResponse[ProcessingStats])
+async def get_processing_stats(service: DocumentServiceDep) -> APIResponse[ProcessingStats]:
+    stats = await service.get_processing_stats()
+    return create_response(data=stats, message="Processing statistics")
+
+
 @router.get("/{document_id}", response_model=APIResponse[DocumentDetail])
 async def get_document(
     document_id: int,
@@ -79,9 +134,72 @@ async def ask_document_question(
     request.document_id = document_id
 
     result = await service.ask_question(
-        question=request.question, document_id=document_id, max_chunks=request.max_chunks
+        question=request.question,
+        document_id=document_id,
+        max_chunks=request.max_chunks,
+        search_mode=request.search_mode,
     )
 
     return create_response(
         data=result, message=f"Question processed successfully for document {document_id}"
     )
+
+
+@router.post("/{document_id}/question/stream")
+async def stream_document_question(
+    document_id: int,
+    request: QuestionRequest,
+    service: RAGServiceDep,
+) -> StreamingResponse:
+    """Answer over Server-Sent Events: ``sources``, then ``token`` events, then ``done``."""
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in service.stream_question(
+                question=request.question,
+                document_id=document_id,
+                max_chunks=request.max_chunks,
+                search_mode=request.search_mode,
+            ):
+                yield create_sse_event(event, data)
+        except Exception as e:
+            # O status 200 já foi enviado: o erro segue como evento
+            logger.error(f"Streaming question for document {document_id} failed: {e}")
+            yield create_sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{document_id}/questions/batch")
+async def stream_document_question_batch(
+    document_id: int,
+    request: BatchQuestionRequest,
+    service: RAGServiceDep,
+) -> StreamingResponse:
+    """Answer many questions over Server-Sent Events, one ``answer`` event each as it finishes.
+
+    Failed questions produce an ``error`` event with their index; a final
+    ``done`` event carries the counts and timings.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in service.stream_batch(
+                document_id=document_id,
+                questions=request.questions,
+                max_chunks=request.max_chunks,
+            ):
+                yield create_sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Batch questions for document {document_id} failed: {e}")
+            yield create_sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,48 @@
 from __future__ import annotations
 
 from datetime import datetime
+from enum import StrEnum
+
+from pydantic import Field
 
 from app.core.base_models import BaseSchema
 
 
+class IngestionJobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IngestionStage(StrEnum):
+    DEDUPLICATION = "deduplication"
+    EXTRACTION = "extraction"
+    CHUNKING = "chunking"
+    EMBEDDING = "embedding"
+
+
+class ExtractionMethod(StrEnum):
+    TEXT_LAYER = "text_layer"
+    OCR = "ocr"
+
+
+class PageExtraction(BaseSchema):
+    page_number: int
+    text: str
+    method: ExtractionMethod = ExtractionMethod.OCR
+    cached: bool = False
+    error: str | None = None
+    timings_ms: dict[str, float] = Field(default_factory=dict)
+
+
+class PageExtractionResult(BaseSchema):
+    page_number: int
+    text_length: int
+    method: ExtractionMethod
+    error: str | None
+
+
 class DocumentProcessingResult(BaseSchema):
     document_id: int
     chunks_created: int
@@ -17,6 +55,7 @@ class RAGProcessingResult(BaseSchema):
     chunks_created: int
     rag_processing_time_ms: int
     status: str
+    deduplicated: bool = False
 
 
 class DocumentUploadResult(BaseSchema):
@@ -26,9 +65,133 @@ class DocumentUploadResult(BaseSchema):
     text_length: int
     processing_time_ms: int
     created_at: datetime
+    pages: list[PageExtractionResult]
+    extraction_timings_ms: dict[str, int] = Field(default_factory=dict)
     rag_processing: RAGProcessingResult
 
 
+class IngestionJobDetail(BaseSchema):
+    id: int
+    file_name: str
+    status: IngestionJobStatus
+    stage: IngestionStage | None
+    progress: float
+    stage_timings_ms: dict[str, int]
+    error: str | None
+    attempts: int
+    document_id: int | None
+    result: DocumentUploadResult | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class BulkFileStatus(StrEnum):
+    SUCCESS = "success"
+    DEDUPLICATED = "deduplicated"
+    FAILED = "failed"
+
+
+class BulkFileResult(BaseSchema):
+    file_name: str
+    status: BulkFileStatus
+    document_id: int | None = None
+    chunks_created: int = 0
+    processing_time_ms: int = 0
+    error: str | None = None
+
+
+class BulkIngestionResult(BaseSchema):
+    files: list[BulkFileResult]
+    succeeded: int
+    failed: int
+    processing_time_ms: int
+
+
+class OCRCacheStats(BaseSchema):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+class EmbeddingCacheStats(BaseSchema):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    tokens_saved: int
+    estimated_time_saved_ms: int
+
+
+class QueryEmbeddingCacheStats(BaseSchema):
+    enabled: bool
+    hits: int
+    shared_hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    max_entries: int
+
+
+class EmbeddingEngineStats(BaseSchema):
+    requests: int
+    tokens: int
+    rate_limited: int
+    retries: int
+    requests_per_minute_limit: int
+    tokens_per_minute_limit: int
+
+
+class DatabasePoolStats(BaseSchema):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    peak_checked_out: int
+    saturation: float
+    checkouts: int
+    waits: int
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class VectorCacheStats(BaseSchema):
+    enabled: bool
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    documents: int
+    size_bytes: int
+    max_bytes: int
+
+
+class AnswerCacheStats(BaseSchema):
+    enabled: bool
+    semantic_enabled: bool
+    hits: int
+    semantic_hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    max_entries: int
+
+
+class ProcessingStats(BaseSchema):
+    ocr_cache: OCRCacheStats
+    embedding_cache: EmbeddingCacheStats
+    embedding_engine: EmbeddingEngineStats
+    query_embedding_cache: QueryEmbeddingCacheStats
+    database_pool: DatabasePoolStats
+    vector_cache: VectorCacheStats
+    answer_cache: AnswerCacheStats
+
+
 class DocumentDetail(BaseSchema):
     id: int
     file_name: str
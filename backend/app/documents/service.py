@@ -3,28 +3,148 @@
 from __future__ import annotations
 
 import asyncio
-import tempfile
+import hashlib
 import time
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
+from typing import Any, BinaryIO
+from uuid import uuid4
 
-import pytesseract
 from fastapi import UploadFile
 from loguru import logger
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.documents.models import Document
+from app.core.db import get_db_session, pool_stats
+from app.core.vector_cache import document_vector_cache
+from app.documents.embedding_cache import embedding_cache
+from app.documents.models import Document, IngestionJob
+from app.documents.ocr import ocr_engine
+from app.documents.preprocessing import PreprocessingOptions, load_image
 from app.documents.rag_processor import DocumentRAGProcessor
 from app.documents.schemas import (
+    AnswerCacheStats,
+    DatabasePoolStats,
     DocumentDetail,
     DocumentProcessingResult,
     DocumentSummary,
     DocumentUploadResult,
+    EmbeddingEngineStats,
+    ExtractionMethod,
+    IngestionJobDetail,
+    IngestionJobStatus,
+    IngestionStage,
+    PageExtraction,
+    PageExtractionResult,
+    ProcessingStats,
     RAGProcessingResult,
+    VectorCacheStats,
 )
+from app.rag.answer_cache import answer_cache
+from app.rag.embeddings import embedding_engine
+from app.rag.query_cache import query_embedding_cache
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class FileTooLargeError(ValueError):
+    pass
+
+
+def _page_windows(page_numbers: list[int], window: int) -> list[tuple[int, int]]:
+    """Group sorted page numbers into contiguous ranges of at most ``window`` pages."""
+    windows: list[tuple[int, int]] = []
+    for page_number in page_numbers:
+        if windows:
+            first_page, last_page = windows[-1]
+            if page_number == last_page + 1 and page_number - first_page < window:
+                windows[-1] = (first_page, page_number)
+                continue
+        windows.append((page_number, page_number))
+    return windows
+
+
+async def _discard_rendered(rendering: Awaitable[tuple[list[Image.Image], float]]) -> None:
+    """Wait for a prefetched window nobody will OCR and close its images."""
+    try:
+        images, _ = await rendering
+    except Exception:
+        return
+    for image in images:
+        image.close()
+
+
+def _sum_timings(pages: list[PageExtraction]) -> dict[str, int]:
+    """Add up per-page stage timings into document totals in milliseconds."""
+    totals: dict[str, float] = {}
+    for page in pages:
+        for stage, elapsed_ms in page.timings_ms.items():
+            totals[stage] = totals.get(stage, 0.0) + elapsed_ms
+    return {stage: round(elapsed_ms) for stage, elapsed_ms in totals.items()}
+
+
+def _spread_timing(pages: list[PageExtraction], stage: str, elapsed_ms: float) -> None:
+    """Attribute a step shared by several pages evenly to each of them."""
+    for page in pages:
+        page.timings_ms[stage] = elapsed_ms / len(pages)
+
+
+class _JobTracker:
+    """Persist stage, progress and per-stage timings of an ingestion job.
+
+    Updates only apply while the job is still on the attempt this worker
+    claimed: a run taken for dead and claimed again by another worker cannot
+    overwrite the newer run.
+    """
+
+    def __init__(self, job_id: int, attempt: int, stage_timings: dict[str, int]) -> None:
+        self.job_id = job_id
+        self.attempt = attempt
+        self.stage_timings = stage_timings
+
+    async def update(self, **values: Any) -> bool:
+        """Apply ``values`` to the job; return False if the attempt was superseded."""
+        async with get_db_session() as db:
+            result = await db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == self.job_id, IngestionJob.attempts == self.attempt)
+                .values(**values)
+            )
+        if not result.rowcount:
+            logger.warning(
+                f"Ingestion job {self.job_id} was claimed again, attempt {self.attempt} "
+                "no longer updates it"
+            )
+            return False
+        return True
+
+    async def heartbeat(self, interval: float) -> None:
+        """Bump ``updated_at`` so other workers do not take the running job for a dead one."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.update(updated_at=func.now()):
+                    return
+            except Exception as e:
+                logger.error(f"Heartbeat of ingestion job {self.job_id} failed: {e}")
+
+    @asynccontextmanager
+    async def stage(self, stage: IngestionStage, progress: float) -> AsyncGenerator[None]:
+        await self.update(stage=stage, progress=progress)
+        start_time = time.perf_counter()
+
+        yield
+
+        self.stage_timings[stage] = int((time.perf_counter() - start_time) * 1000)
+        await self.update(stage_timings=dict(self.stage_timings))
+
+    async def extraction_progress(self, pages_done: int, page_count: int) -> None:
+        # Extração ocupa os primeiros 60% do progresso do job
+        await self.update(progress=round(0.6 * pages_done / max(page_count, 1), 3))
 
 
 class DocumentService:
@@ -34,57 +154,355 @@ class DocumentService:
         self.supported_formats = {".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
         self.rag_processor = DocumentRAGProcessor()
 
-    async def upload_and_extract(self, file: UploadFile, db: AsyncSession) -> DocumentUploadResult:
-        if not file.filename:
+    async def enqueue_upload(self, file: UploadFile, db: AsyncSession) -> IngestionJobDetail:
+        """Store the upload and queue it for background ingestion."""
+        file_name = file.filename or ""
+        file_ext = self.validate_file_name(file_name)
+        file_path, content_hash = await self.store_upload(file, file_ext)
+
+        job = IngestionJob(
+            file_name=file_name,
+            file_path=str(file_path),
+            content_hash=content_hash,
+            status=IngestionJobStatus.QUEUED,
+            progress=0.0,
+            stage_timings={},
+            attempts=0,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        logger.info(f"Queued ingestion job {job.id} for {file_name}")
+        return self._to_job_detail(job, None)
+
+    def validate_file_name(self, file_name: str) -> str:
+        """Return the lowercase extension of a supported file name."""
+        if not file_name:
             logger.error("File name is required")
             raise ValueError("File name is required")
 
-        file_ext = Path(file.filename).suffix.lower()
+        file_ext = Path(file_name).suffix.lower()
         if file_ext not in self.supported_formats:
             logger.error(f"Format {file_ext} not supported")
             raise ValueError(f"Format {file_ext} not supported")
 
-        file_path = self.upload_dir / file.filename
-        content = await file.read()
+        return file_ext
 
-        with open(file_path, "wb") as f:
-            f.write(content)
+    async def store_upload(self, file: UploadFile, file_ext: str) -> tuple[Path, str]:
+        max_file_size = settings.app.max_file_size
+        if file.size is not None and file.size > max_file_size:
+            raise FileTooLargeError(f"File exceeds the maximum size of {max_file_size} bytes")
 
-            start_time = time.perf_counter()
-            text_content = await self._extract_text(file_path)
-            processing_time = int((time.perf_counter() - start_time) * 1000)
+        async def _read_chunks() -> AsyncIterator[bytes]:
+            while chunk := await file.read(settings.app.upload_chunk_size):
+                yield chunk
+
+        return await self.store_stream(_read_chunks(), file_ext)
+
+    async def store_stream(self, chunks: AsyncIterator[bytes], file_ext: str) -> tuple[Path, str]:
+        """Write chunks to disk, enforcing ``max_file_size`` as bytes arrive.
+
+        Returns the content-addressed path of the stored file and its SHA-256 hash.
+        """
+        max_file_size = settings.app.max_file_size
+        loop = asyncio.get_event_loop()
+        digest = hashlib.sha256()
+        temp_path = self.upload_dir / f".upload-{uuid4().hex}{file_ext}"
+        size = 0
+
+        def _write_chunk(f: BinaryIO, chunk: bytes) -> None:
+            digest.update(chunk)
+            f.write(chunk)
+
+        try:
+            f = await loop.run_in_executor(None, open, temp_path, "wb")
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_file_size:
+                        raise FileTooLargeError(
+                            f"File exceeds the maximum size of {max_file_size} bytes"
+                        )
+                    await loop.run_in_executor(None, _write_chunk, f, chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+
+            # Arquivos são guardados pelo hash do conteúdo: nomes iguais não se
+            # sobrescrevem e uploads repetidos não ocupam espaço extra.
+            content_hash = digest.hexdigest()
+            file_path = self._content_path(content_hash, file_ext)
+            if file_path.exists():
+                temp_path.unlink()
+            else:
+                file_path.parent.mkdir(exist_ok=True)
+                temp_path.replace(file_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Stored {size} bytes as {file_path.name}")
+        return file_path, content_hash
+
+    async def get_ingestion_job(self, job_id: int, db: AsyncSession) -> IngestionJobDetail | None:
+        job = await db.get(IngestionJob, job_id)
+        if not job:
+            return None
+
+        document = await db.get(Document, job.document_id) if job.document_id else None
+        return self._to_job_detail(job, document)
+
+    async def process_ingestion_job(self, job_id: int) -> None:
+        """Run extraction, chunking and embedding for a claimed job.
+
+        A file whose content hash matches an already ingested document reuses
+        its text and chunk embeddings. A retried job whose document was already
+        extracted skips OCR and only redoes chunking and embedding.
+        """
+        async with get_db_session() as db:
+            job = await db.get(IngestionJob, job_id)
+            if not job:
+                logger.warning(f"Ingestion job {job_id} not found")
+                return
+            document = await db.get(Document, job.document_id) if job.document_id else None
+
+        tracker = _JobTracker(job_id, int(job.attempts), dict(job.stage_timings or {}))
+        # Etapas longas (embedding, OCR de uma imagem grande) não atualizam o job sozinhas
+        heartbeat = asyncio.create_task(
+            tracker.heartbeat(settings.ingestion.heartbeat_interval),
+            name=f"ingestion-heartbeat-{job_id}",
+        )
+
+        try:
+            if document is None and job.content_hash:
+                document, chunks_reused = await self._reuse_duplicate(job, tracker)
+                if chunks_reused:
+                    completed = await tracker.update(
+                        status=IngestionJobStatus.COMPLETED,
+                        progress=1.0,
+                        error=None,
+                        finished_at=func.now(),
+                        result={
+                            "pages": [],
+                            "processing_time_ms": 0,
+                            "chunks_created": chunks_reused,
+                            "rag_processing_time_ms": 0,
+                            "deduplicated": True,
+                        },
+                    )
+                    if completed:
+                        logger.info(
+                            f"Ingestion job {job_id} reused {chunks_reused} existing chunks"
+                        )
+                    return
+
+            if document is None:
+                async with tracker.stage(IngestionStage.EXTRACTION, progress=0.0):
+                    pages = await self.extract_text(
+                        Path(job.file_path), on_progress=tracker.extraction_progress
+                    )
+                    if pages and all(page.error for page in pages):
+                        raise ValueError(
+                            f"Text extraction failed for every page of {job.file_name}"
+                        )
+                    text_content = "\n\n".join(page.text for page in pages if not page.error)
+
+                page_results = [
+                    PageExtractionResult(
+                        page_number=page.page_number,
+                        text_length=len(page.text),
+                        method=page.method,
+                        error=page.error,
+                    ).model_dump(mode="json")
+                    for page in pages
+                ]
+                extraction_timings = _sum_timings(pages)
+                extraction_result: dict[str, Any] = {
+                    "pages": page_results,
+                    "processing_time_ms": tracker.stage_timings[IngestionStage.EXTRACTION],
+                    "extraction_timings_ms": extraction_timings,
+                }
+                logger.info(f"Extraction timings for {job.file_name}: {extraction_timings}")
+
+                async with get_db_session() as db:
+                    document = Document(
+                        file_name=job.file_name,
+                        file_path=job.file_path,
+                        text_content=text_content,
+                        content_hash=job.content_hash,
+                    )
+                    db.add(document)
+                    await db.flush()
+                    await db.execute(
+                        update(IngestionJob)
+                        .where(IngestionJob.id == job_id, IngestionJob.attempts == tracker.attempt)
+                        .values(document_id=document.id, result=extraction_result)
+                    )
+            else:
+                # Retry, ou duplicata ainda sem chunks: reaproveita o texto já extraído
+                await self.rag_processor.delete_document_chunks(int(document.id))
+                text_content = str(document.text_content)
+                extraction_result = dict(job.result) if job.result else {}
+
+            async with tracker.stage(IngestionStage.CHUNKING, progress=0.6):
+                chunks = self.rag_processor.split_text(text_content)
+
+            async with tracker.stage(IngestionStage.EMBEDDING, progress=0.7):
+                await self.rag_processor.index_chunks(int(document.id), chunks)
+
+            completed = await tracker.update(
+                status=IngestionJobStatus.COMPLETED,
+                progress=1.0,
+                error=None,
+                finished_at=func.now(),
+                result={
+                    **extraction_result,
+                    "chunks_created": len(chunks),
+                    "rag_processing_time_ms": (
+                        tracker.stage_timings[IngestionStage.CHUNKING]
+                        + tracker.stage_timings[IngestionStage.EMBEDDING]
+                    ),
+                },
+            )
+            if completed:
+                logger.info(f"Ingestion job {job_id} completed with {len(chunks)} chunks")
+
+        except Exception as e:
+            retry = not isinstance(e, ValueError) and job.attempts < settings.ingestion.max_attempts
+            logger.exception(f"Ingestion job {job_id} failed (retry={retry}): {e}")
+            await tracker.update(
+                status=IngestionJobStatus.QUEUED if retry else IngestionJobStatus.FAILED,
+                error=f"{type(e).__name__}: {e}",
+                finished_at=None if retry else func.now(),
+            )
+
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+
+    async def _reuse_duplicate(
+        self, job: IngestionJob, tracker: _JobTracker
+    ) -> tuple[Document | None, int]:
+        """Create the job's document from an earlier upload with the same content.
+
+        Returns the new document, or ``None`` when there is no earlier upload,
+        and the number of chunk embeddings copied from it.
+        """
+        source = await self.find_duplicate(str(job.content_hash))
+        if source is None:
+            return None, 0
+
+        async with tracker.stage(IngestionStage.DEDUPLICATION, progress=0.0):
+            async with get_db_session() as db:
+                document = Document(
+                    file_name=job.file_name,
+                    file_path=job.file_path,
+                    text_content=source.text_content,
+                    content_hash=job.content_hash,
+                )
+                db.add(document)
+                await db.flush()
+                await db.execute(
+                    update(IngestionJob)
+                    .where(IngestionJob.id == job.id, IngestionJob.attempts == tracker.attempt)
+                    .values(document_id=document.id, result={"pages": [], "processing_time_ms": 0})
+                )
+
+            chunks_reused = await self.rag_processor.copy_document_chunks(
+                int(source.id), int(document.id)
+            )
+
+        logger.info(f"Document {document.id} is a duplicate of document {source.id}")
+        return document, chunks_reused
 
+    async def create_document(
+        self, file_name: str, file_path: Path, text_content: str, content_hash: str
+    ) -> Document:
+        async with get_db_session() as db:
             document = Document(
-                file_name=file.filename,
+                file_name=file_name,
                 file_path=str(file_path),
                 text_content=text_content,
+                content_hash=content_hash,
             )
             db.add(document)
-            await db.commit()
-            await db.refresh(document)
+        return document
+
+    async def find_duplicate(self, content_hash: str) -> Document | None:
+        """Return the earliest document ingested from the same file content."""
+        async with get_db_session() as db:
+            result = await db.execute(
+                select(Document)
+                .where(Document.content_hash == content_hash)
+                .order_by(Document.id)
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
 
-            rag_result = await self.process_document_for_rag(int(document.id), text_content)
+    def _content_path(self, content_hash: str, file_ext: str) -> Path:
+        return self.upload_dir / content_hash[:2] / f"{content_hash}{file_ext}"
 
-            return DocumentUploadResult(
+    def _to_job_detail(self, job: IngestionJob, document: Document | None) -> IngestionJobDetail:
+        result = None
+        if document is not None and job.status == IngestionJobStatus.COMPLETED and job.result:
+            result = DocumentUploadResult(
                 id=document.id,
                 file_name=document.file_name,
-                text_content=text_content,
-                text_length=len(text_content),
-                processing_time_ms=processing_time,
+                text_content=document.text_content,
+                text_length=len(document.text_content),
+                processing_time_ms=job.result.get("processing_time_ms", 0),
                 created_at=document.created_at,
+                pages=job.result.get("pages", []),
+                extraction_timings_ms=job.result.get("extraction_timings_ms", {}),
                 rag_processing=RAGProcessingResult(
-                    chunks_created=rag_result.chunks_created,
-                    rag_processing_time_ms=rag_result.processing_time_ms,
-                    status=rag_result.status,
+                    chunks_created=job.result["chunks_created"],
+                    rag_processing_time_ms=job.result["rag_processing_time_ms"],
+                    status="success",
+                    deduplicated=job.result.get("deduplicated", False),
                 ),
             )
 
+        return IngestionJobDetail(
+            id=job.id,
+            file_name=job.file_name,
+            status=job.status,
+            stage=job.stage,
+            progress=job.progress,
+            stage_timings_ms=job.stage_timings or {},
+            error=job.error,
+            attempts=job.attempts,
+            document_id=job.document_id,
+            result=result,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
+
     async def process_document_for_rag(
         self, document_id: int, text_content: str
     ) -> DocumentProcessingResult:
         """Processar documento para RAG usando processor independente."""
         return await self.rag_processor.process_document(document_id, text_content)
 
+    async def get_processing_stats(self) -> ProcessingStats:
+        return ProcessingStats(
+            ocr_cache=await ocr_engine.cache_stats(),
+            embedding_cache=await embedding_cache.stats(),
+            embedding_engine=EmbeddingEngineStats(
+                requests=embedding_engine.requests,
+                tokens=embedding_engine.tokens,
+                rate_limited=embedding_engine.rate_limited,
+                retries=embedding_engine.retries,
+                requests_per_minute_limit=int(embedding_engine.request_bucket.capacity),
+                tokens_per_minute_limit=int(embedding_engine.token_bucket.capacity),
+            ),
+            query_embedding_cache=query_embedding_cache.stats(),
+            database_pool=DatabasePoolStats(**pool_stats()),
+            vector_cache=VectorCacheStats(**document_vector_cache.stats()),
+            answer_cache=AnswerCacheStats(**answer_cache.stats()),
+        )
+
     async def get_document(self, document_id: int, db: AsyncSession) -> DocumentDetail | None:
         result = await db.execute(select(Document).where(Document.id == document_id))
         doc = result.scalar_one_or_none()
@@ -121,47 +539,185 @@ class DocumentService:
         if not doc:
             return False
 
-        await self.rag_processor.delete_document_chunks(document_id)
+        # Os chunks saem junto com o documento pelo ON DELETE CASCADE de document_chunks.
+        # O arquivo é compartilhado por uploads com o mesmo conteúdo
+        shared = await db.scalar(
+            select(func.count())
+            .select_from(Document)
+            .where(Document.file_path == doc.file_path, Document.id != document_id)
+        )
+        pending = await db.scalar(
+            select(func.count())
+            .select_from(IngestionJob)
+            .where(
+                IngestionJob.file_path == doc.file_path,
+                IngestionJob.status.in_([IngestionJobStatus.QUEUED, IngestionJobStatus.RUNNING]),
+            )
+        )
 
         file_path = Path(doc.file_path)
-        if file_path.exists():
+        if not shared and not pending and file_path.exists():
             file_path.unlink()
 
         await db.delete(doc)
         await db.commit()
+        document_vector_cache.invalidate(document_id)
+        answer_cache.invalidate_document(document_id)
         return True
 
-    async def _extract_text(self, file_path: Path) -> str:
+    async def extract_text(
+        self, file_path: Path, on_progress: ProgressCallback | None = None
+    ) -> list[PageExtraction]:
         if file_path.suffix.lower() == ".pdf":
-            return await self._extract_from_pdf(file_path)
+            return await self._extract_from_pdf(file_path, on_progress)
         else:
             return await self._extract_from_image(file_path)
 
-    async def _extract_from_image(self, image_path: Path) -> str:
-        loop = asyncio.get_event_loop()
+    async def _extract_from_image(self, image_path: Path) -> list[PageExtraction]:
+        options = PreprocessingOptions.for_format(image_path.suffix.lower())
+
+        def _decode() -> Image.Image:
+            image = load_image(str(image_path), options)
+            image.load()
+            return image
 
-        def _extract() -> str:
-            image = Image.open(image_path)
-            return pytesseract.image_to_string(image, lang="por+eng")
+        start_time = time.perf_counter()
+        image = await asyncio.get_event_loop().run_in_executor(None, _decode)
+        decode_ms = (time.perf_counter() - start_time) * 1000
 
-        return await loop.run_in_executor(None, _extract)
+        try:
+            pages = await ocr_engine.ocr_pages([image], preprocessing=options)
+        finally:
+            image.close()
 
-    async def _extract_from_pdf(self, pdf_path: Path) -> str:
+        _spread_timing(pages, "decode", decode_ms)
+        return pages
+
+    async def _extract_from_pdf(
+        self, pdf_path: Path, on_progress: ProgressCallback | None = None
+    ) -> list[PageExtraction]:
         loop = asyncio.get_event_loop()
 
-        def _extract() -> str:
-            images = convert_from_path(pdf_path)
-            all_text = []
+        info = await loop.run_in_executor(None, pdfinfo_from_path, str(pdf_path))
+        page_count = int(info["Pages"])
+        # Janelas menores que o pool deixariam processos de OCR ociosos
+        window = (
+            max(settings.app.pdf_page_window, ocr_engine.max_workers)
+            if settings.app.pdf_streaming
+            else page_count
+        )
 
-            for image in images:
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_file:
-                    image.save(temp_file.name, "PNG")
-                    try:
-                        text = pytesseract.image_to_string(image, lang="por+eng")
-                        all_text.append(text.strip())
-                    finally:
-                        Path(temp_file.name).unlink()
+        # Páginas com camada de texto suficiente dispensam rasterização e OCR
+        pages_by_number: dict[int, PageExtraction] = {}
+        if settings.app.pdf_text_layer:
+            start_time = time.perf_counter()
+            for page_number, text in enumerate(await self._read_text_layer(pdf_path), start=1):
+                if page_number <= page_count and len(text) >= settings.app.pdf_min_text_chars:
+                    pages_by_number[page_number] = PageExtraction(
+                        page_number=page_number, text=text, method=ExtractionMethod.TEXT_LAYER
+                    )
+            if pages_by_number:
+                _spread_timing(
+                    list(pages_by_number.values()),
+                    "text_layer",
+                    (time.perf_counter() - start_time) * 1000,
+                )
+
+        ocr_page_numbers = [n for n in range(1, page_count + 1) if n not in pages_by_number]
+        if on_progress and pages_by_number:
+            await on_progress(len(pages_by_number), page_count)
+
+        windows = _page_windows(ocr_page_numbers, window)
+        upcoming: asyncio.Future[tuple[list[Image.Image], float]] | None = None
+        try:
+            for position, (first_page, last_page) in enumerate(windows):
+                current = upcoming or self._render_pdf_window(pdf_path, first_page, last_page)
+                # Rasteriza a próxima janela enquanto o OCR processa esta
+                upcoming = (
+                    self._render_pdf_window(pdf_path, *windows[position + 1])
+                    if position + 1 < len(windows)
+                    else None
+                )
+                for page in await self._ocr_pdf_window(current, first_page, last_page):
+                    pages_by_number[page.page_number] = page
+                if on_progress:
+                    await on_progress(len(pages_by_number), page_count)
+        finally:
+            if upcoming is not None:
+                await _discard_rendered(upcoming)
+
+        logger.info(
+            f"Extracted {page_count} pages from {pdf_path.name}: "
+            f"{page_count - len(ocr_page_numbers)} from text layer, "
+            f"{len(ocr_page_numbers)} with OCR in windows of {window}"
+        )
+        return [pages_by_number[n] for n in range(1, page_count + 1)]
+
+    async def _read_text_layer(self, pdf_path: Path) -> list[str]:
+        """Return the embedded text of every page using poppler's ``pdftotext``.
+
+        An unreadable text layer yields an empty list, so every page goes to OCR.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "pdftotext",
+                "-layout",
+                "-enc",
+                "UTF-8",
+                str(pdf_path),
+                "-",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+        except OSError as e:
+            logger.warning(f"pdftotext unavailable, falling back to OCR: {e}")
+            return []
 
-            return "\n\n".join(all_text)
+        if process.returncode != 0:
+            logger.warning(f"pdftotext failed for {pdf_path.name}: {stderr.decode().strip()}")
+            return []
+
+        # pdftotext separa as páginas com form feed
+        return [page.strip() for page in stdout.decode("utf-8", errors="replace").split("\f")]
+
+    def _render_pdf_window(
+        self, pdf_path: Path, first_page: int, last_page: int
+    ) -> asyncio.Future[tuple[list[Image.Image], float]]:
+        """Start rasterizing ``first_page..last_page`` in the default executor."""
+
+        def _render() -> tuple[list[Image.Image], float]:
+            start_time = time.perf_counter()
+            images = convert_from_path(
+                pdf_path, dpi=settings.app.pdf_dpi, first_page=first_page, last_page=last_page
+            )
+            return images, (time.perf_counter() - start_time) * 1000
+
+        return asyncio.get_event_loop().run_in_executor(None, _render)
+
+    async def _ocr_pdf_window(
+        self,
+        rendering: Awaitable[tuple[list[Image.Image], float]],
+        first_page: int,
+        last_page: int,
+    ) -> list[PageExtraction]:
+        """OCR one rendered window and release its images, so memory stays bounded."""
+        try:
+            images, render_ms = await rendering
+        except Exception as e:
+            logger.warning(f"Failed to rasterize pages {first_page}-{last_page}: {e}")
+            return [
+                PageExtraction(page_number=page_number, text="", error=f"{type(e).__name__}: {e}")
+                for page_number in range(first_page, last_page + 1)
+            ]
+
+        # As páginas já saem no DPI configurado, o que guia o redimensionamento
+        options = PreprocessingOptions.for_format(".pdf", source_dpi=settings.app.pdf_dpi)
+        try:
+            pages = await ocr_engine.ocr_pages(images, first_page=first_page, preprocessing=options)
+        finally:
+            for image in images:
+                image.close()
 
-        return await loop.run_in_executor(None, _extract)
+        _spread_timing(pages, "render", render_ms)
+        return pages
@@ -0,0 +1,158 @@
+"""Cache de respostas do RAG, com correspondência exata ou semântica da pergunta."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.core.config import AnswerCacheConfig, settings
+from app.rag.query_cache import normalize_question
+from app.rag.schemas import SourceChunk
+
+
+@dataclass(frozen=True)
+class AnswerScope:
+    """Everything besides the question that determines an answer."""
+
+    document_id: int | None
+    content_version: str
+    model: str
+    prompt_version: str
+    max_chunks: int
+    search_mode: str
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    source_chunks: list[SourceChunk]
+    embedding: np.ndarray | None
+    expires_at: float
+
+
+class AnswerCache:
+    """In-process LRU of answers keyed by :class:`AnswerScope` and normalized question.
+
+    In semantic mode a miss on the exact question falls back to the cached
+    question of the same scope whose embedding is most similar, if the cosine
+    similarity reaches ``similarity_threshold``. The content version in the
+    scope changes whenever a document's chunks are rewritten, so answers of a
+    re-ingested document are never served; ``invalidate_document`` also frees
+    them right away in this process.
+    """
+
+    def __init__(self, config: AnswerCacheConfig | None = None) -> None:
+        self.config = config or settings.answer_cache
+        self._entries: OrderedDict[tuple[AnswerScope, str], CachedAnswer] = OrderedDict()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    @property
+    def semantic(self) -> bool:
+        return self.config.semantic_enabled
+
+    def get(
+        self, scope: AnswerScope, question: str, embedding: list[float] | None = None
+    ) -> tuple[CachedAnswer, float] | None:
+        """Return the cached answer and question similarity (1.0 for an exact match)."""
+        now = time.monotonic()
+        key = (scope, normalize_question(question))
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, 1.0
+
+        if self.semantic and embedding is not None:
+            match = self._most_similar(scope, embedding, now)
+            if match is not None:
+                match_key, entry, similarity = match
+                self._entries.move_to_end(match_key)
+                self.semantic_hits += 1
+                return entry, similarity
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        scope: AnswerScope,
+        question: str,
+        answer: str,
+        source_chunks: list[SourceChunk],
+        embedding: list[float] | None = None,
+    ) -> None:
+        vector = None
+        if self.semantic and embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            vector = vector / norm if norm else None
+
+        key = (scope, normalize_question(question))
+        self._entries[key] = CachedAnswer(
+            answer=answer,
+            source_chunks=source_chunks,
+            embedding=vector,
+            expires_at=time.monotonic() + self.config.ttl_seconds,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_document(self, document_id: int) -> None:
+        """Drop the answers of a document and of cross-document questions."""
+        for key in [key for key in self._entries if key[0].document_id in (document_id, None)]:
+            del self._entries[key]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "enabled": self.config.enabled,
+            "semantic_enabled": self.config.semantic_enabled,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.config.max_entries,
+        }
+
+    def _most_similar(
+        self, scope: AnswerScope, embedding: list[float], now: float
+    ) -> tuple[tuple[AnswerScope, str], CachedAnswer, float] | None:
+        candidates = [
+            (key, entry, entry.embedding)
+            for key, entry in self._entries.items()
+            if key[0] == scope and entry.embedding is not None and entry.expires_at > now
+        ]
+        if not candidates:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return None
+
+        matrix = np.stack([vector for _, _, vector in candidates])
+        similarities = matrix @ (query / norm)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.config.similarity_threshold:
+            return None
+        key, entry, _ = candidates[best]
+        return key, entry, float(similarities[best])
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,228 @@
+"""Montagem do contexto do prompt: seleção MMR, junção de chunks vizinhos e orçamento de tokens."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import tiktoken
+from loguru import logger
+
+from app.core.config import ContextConfig, settings
+from app.core.vector_store import PGVectorService
+
+# O splitter repete até chunk_overlap (200) caracteres; chunk_size limita a busca
+MAX_OVERLAP_CHARS = 1000
+# Coincidências menores que isso não são tratadas como sobreposição
+MIN_OVERLAP_CHARS = 16
+PASSAGE_SEPARATOR = "\n\n"
+
+
+def overlap_length(previous: str, following: str) -> int:
+    """Length of the longest suffix of ``previous`` that ``following`` starts with."""
+    tail = previous[-MAX_OVERLAP_CHARS:]
+    for start in range(len(tail) - MIN_OVERLAP_CHARS + 1):
+        if following.startswith(tail[start:]):
+            return len(tail) - start
+    return 0
+
+
+@dataclass
+class Passage:
+    """Consecutive chunks of one document, joined without the repeated overlap."""
+
+    document_id: int
+    chunks: list[dict[str, Any]]
+    content: str
+    rank: int
+    tokens: int = 0
+
+    @property
+    def source(self) -> str:
+        first, last = self.chunks[0]["chunk_id"], self.chunks[-1]["chunk_id"]
+        if first == last:
+            return f"document_{self.document_id}_chunk_{first}"
+        return f"document_{self.document_id}_chunks_{first}-{last}"
+
+
+@dataclass
+class PackedContext:
+    passages: list[Passage] = field(default_factory=list)
+    tokens: int = 0
+    retrieved_tokens: int = 0  # the selected chunks pasted as they were
+
+    @property
+    def text(self) -> str:
+        return PASSAGE_SEPARATOR.join(passage.content for passage in self.passages)
+
+    @property
+    def results(self) -> list[dict[str, Any]]:
+        """The retrieval results that made it into the context."""
+        return [chunk for passage in self.passages for chunk in passage.chunks]
+
+
+class ContextAssembler:
+    """Turns ranked retrieval results into the context of the RAG prompt.
+
+    Optionally re-selects ``max_chunks`` of the candidates with maximal
+    marginal relevance, merges consecutive chunks of a document while
+    dropping the text the splitter repeated between them, and keeps whole
+    passages in relevance order until ``max_tokens`` is reached.
+    """
+
+    def __init__(self, vector_store: PGVectorService, config: ContextConfig | None = None) -> None:
+        self.vector_store = vector_store
+        self.config = config or settings.context
+        self._encoding: tiktoken.Encoding | None = None
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(settings.openai.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    @property
+    def mmr_enabled(self) -> bool:
+        return self.config.mmr_enabled
+
+    def candidate_count(self, max_chunks: int) -> int:
+        """Chunks to retrieve so that ``max_chunks`` can be selected from them."""
+        if self.mmr_enabled:
+            return max_chunks * max(self.config.mmr_fetch_factor, 1)
+        return max_chunks
+
+    async def load_embeddings(
+        self, results: list[dict[str, Any]]
+    ) -> dict[tuple[int, int], list[float]]:
+        """Embeddings MMR needs for ``results``; empty when MMR is off."""
+        if not self.mmr_enabled:
+            return {}
+        keys = list(
+            dict.fromkeys((result["document_id"], result["chunk_id"]) for result in results)
+        )
+        return await self.vector_store.chunk_embeddings(keys)
+
+    async def build(
+        self,
+        results: list[dict[str, Any]],
+        max_chunks: int,
+        query_embedding: list[float] | None = None,
+    ) -> PackedContext:
+        embeddings = await self.load_embeddings(results) if query_embedding is not None else {}
+        return self.pack(results, max_chunks, query_embedding, embeddings)
+
+    def pack(
+        self,
+        results: list[dict[str, Any]],
+        max_chunks: int,
+        query_embedding: list[float] | None = None,
+        embeddings: dict[tuple[int, int], list[float]] | None = None,
+    ) -> PackedContext:
+        """Select, merge and budget ``results``, which come ordered by relevance."""
+        if self.mmr_enabled and query_embedding is not None and embeddings:
+            selected = self.select_mmr(results, max_chunks, query_embedding, embeddings)
+        else:
+            selected = results[:max_chunks]
+
+        # Cópias de um documento trazem o mesmo texto com outro document_id
+        unique: dict[str, tuple[int, dict[str, Any]]] = {}
+        for rank, result in enumerate(selected):
+            unique.setdefault(result["content"], (rank, result))
+
+        retrieved_tokens = sum(len(self.encoding.encode(content)) for content in unique)
+        passages = self._merge(list(unique.values()))
+        packed = self._fit(passages)
+        packed.retrieved_tokens = retrieved_tokens
+
+        logger.info(
+            f"Packed {len(packed.results)}/{len(selected)} chunks into {len(packed.passages)} "
+            f"passages: {packed.tokens} of {retrieved_tokens} retrieved tokens"
+        )
+        return packed
+
+    def select_mmr(
+        self,
+        results: list[dict[str, Any]],
+        max_chunks: int,
+        query_embedding: list[float],
+        embeddings: dict[tuple[int, int], list[float]],
+    ) -> list[dict[str, Any]]:
+        """Greedy maximal marginal relevance over cosine similarities."""
+        candidates = [
+            result
+            for result in results
+            if (result["document_id"], result["chunk_id"]) in embeddings
+        ]
+        if len(candidates) <= max_chunks:
+            return candidates
+
+        matrix = np.asarray(
+            [embeddings[(result["document_id"], result["chunk_id"])] for result in candidates],
+            dtype=np.float32,
+        )
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        relevance = matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+
+        weight = self.config.mmr_lambda
+        chosen = [int(np.argmax(relevance))]
+        redundancy = matrix @ matrix[chosen[0]]
+        while len(chosen) < max_chunks:
+            scores = weight * relevance - (1 - weight) * redundancy
+            scores[chosen] = -np.inf
+            best = int(np.argmax(scores))
+            chosen.append(best)
+            redundancy = np.maximum(redundancy, matrix @ matrix[best])
+
+        return [candidates[index] for index in chosen]
+
+    def _merge(self, ranked: list[tuple[int, dict[str, Any]]]) -> list[Passage]:
+        if not self.config.merge_adjacent:
+            return [
+                Passage(result["document_id"], [result], result["content"], rank)
+                for rank, result in ranked
+            ]
+
+        passages: list[Passage] = []
+        ordered = sorted(ranked, key=lambda item: (item[1]["document_id"], item[1]["chunk_id"]))
+        for rank, result in ordered:
+            previous = passages[-1] if passages else None
+            if (
+                previous is not None
+                and previous.document_id == result["document_id"]
+                and previous.chunks[-1]["chunk_id"] + 1 == result["chunk_id"]
+            ):
+                overlap = overlap_length(previous.content, result["content"])
+                separator = "" if overlap else "\n"
+                previous.content += separator + result["content"][overlap:]
+                previous.chunks.append(result)
+                previous.rank = min(previous.rank, rank)
+            else:
+                passages.append(Passage(result["document_id"], [result], result["content"], rank))
+
+        return sorted(passages, key=lambda passage: passage.rank)
+
+    def _fit(self, passages: list[Passage]) -> PackedContext:
+        budget = self.config.max_tokens
+        separator_tokens = len(self.encoding.encode(PASSAGE_SEPARATOR))
+        packed = PackedContext()
+
+        for passage in passages:
+            tokens = self.encoding.encode(passage.content)
+            cost = len(tokens) + (separator_tokens if packed.passages else 0)
+            if packed.tokens + cost <= budget:
+                passage.tokens = len(tokens)
+                packed.passages.append(passage)
+                packed.tokens += cost
+            elif not packed.passages:
+                # Nem o trecho mais relevante cabe: entra cortado no limite
+                passage.content = self.encoding.decode(tokens[:budget])
+                passage.tokens = min(len(tokens), budget)
+                packed.passages.append(passage)
+                packed.tokens = passage.tokens
+
+        return packed
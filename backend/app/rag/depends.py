@@ -1,17 +1,30 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
+from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_db
 from app.rag.service import LangChainRAGService
 
 
+@lru_cache(maxsize=1)
 def get_rag_service() -> LangChainRAGService:
+    """Shared RAG service: one LLM client, vector store and chain template per process."""
     return LangChainRAGService()
 
 
+async def init_rag_service() -> None:
+    """Build the RAG service at startup so the first question does not pay for it."""
+    try:
+        get_rag_service()
+    except ValueError as e:
+        # Sem chave a API continua subindo; perguntas falham como antes
+        logger.warning(f"RAG service not initialized: {e}")
+
+
 DatabaseDep = Annotated[AsyncSession, Depends(get_db)]
 RAGServiceDep = Annotated[LangChainRAGService, Depends(get_rag_service)]
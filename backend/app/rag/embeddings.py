@@ -1,46 +1,240 @@
 from __future__ import annotations
 
 import asyncio
+import random
+import time
+from collections.abc import Coroutine, Mapping
+from typing import Any, TypeVar
 
-from langchain_openai import OpenAIEmbeddings
+import tiktoken
+from langchain_core.embeddings import Embeddings
 from loguru import logger
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 
-from app.core.config import settings
+from app.core.config import EmbeddingConfig, settings
+from app.rag.query_cache import query_embedding_cache
+from app.rag.rate_limit import TokenBucket
 
+T = TypeVar("T")
 
-class LangChainEmbeddingsService:
-    def __init__(self) -> None:
-        api_key = settings.openai.api_key.get_secret_value()
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not configured")
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
 
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=api_key,
-            model=settings.openai.embedding_model,
-        )
 
-        self.embedding_model = settings.openai.embedding_model
+def _header_number(headers: Mapping[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
 
-    async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
+
+class OpenAIEmbeddingEngine(Embeddings):
+    """Embedding client shared by ingestion and queries.
+
+    Inputs are grouped into batches by tiktoken count and the batches run
+    concurrently up to ``max_concurrency``. Two token buckets (requests and
+    tokens per minute) pace the calls; they start from the configured limits
+    and follow the ``x-ratelimit-*`` headers of every response. A 429 pauses
+    both buckets for the server's ``retry-after`` or an exponential backoff.
+    """
+
+    def __init__(self, config: EmbeddingConfig | None = None, model: str | None = None) -> None:
+        self.config = config or settings.embedding
+        self.model = model or settings.openai.embedding_model
+
+        self.request_bucket = TokenBucket(self.config.requests_per_minute)
+        self.token_bucket = TokenBucket(self.config.tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+
+        self._client: AsyncOpenAI | None = None
+        self._encoding: tiktoken.Encoding | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self.requests = 0
+        self.tokens = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            api_key = settings.openai.api_key.get_secret_value()
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not configured")
+            # As novas tentativas são feitas aqui, respeitando os buckets
+            self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        return self._client
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
         if not texts:
             return []
 
-        all_embeddings = []
-        batch_size = 100
+        self._loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+
+        texts, token_counts = await self._loop.run_in_executor(None, self._tokenize, texts)
+        batches = self._make_batches(token_counts)
+        results = await asyncio.gather(
+            *(
+                self._embed_batch(texts[start:end], sum(token_counts[start:end]))
+                for start, end in batches
+            )
+        )
+
+        logger.info(
+            f"Embedded {len(texts)} texts ({sum(token_counts)} tokens) in {len(batches)} "
+            f"requests in {int((time.perf_counter() - start_time) * 1000)}ms"
+        )
+        return [embedding for batch in results for embedding in batch]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await query_embedding_cache.get_or_embed(self.model, text, self._embed_one)
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several questions at once, reusing cached query vectors."""
+        return await query_embedding_cache.get_or_embed_many(
+            self.model, texts, self.aembed_documents
+        )
 
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
+    async def _embed_one(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
 
-            batch_embeddings = await self.embeddings.aembed_documents(batch)
-            all_embeddings.extend(batch_embeddings)
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._run_sync(self.aembed_documents(texts))
 
-            if i + batch_size < len(texts):
-                await asyncio.sleep(0.1)
+    def embed_query(self, text: str) -> list[float]:
+        return self._run_sync(self.aembed_query(text))
 
-        logger.info(f"Generated embeddings for {len(texts)} texts using LangChain")
-        return all_embeddings
+    def _run_sync(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        # LangChain chama a API síncrona a partir de threads do executor: a
+        # chamada volta para o loop principal para compartilhar buckets e semáforo.
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                running_loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is loop:
+                coroutine.close()
+                raise RuntimeError("Use the async embedding methods inside the event loop")
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+        return asyncio.run(coroutine)
+
+    def _tokenize(self, texts: list[str]) -> tuple[list[str], list[int]]:
+        max_tokens = self.config.max_input_tokens
+        encoded = self.encoding.encode_ordinary_batch(texts)
+
+        prepared, token_counts = [], []
+        for text, tokens in zip(texts, encoded, strict=True):
+            if len(tokens) > max_tokens:
+                logger.warning(f"Truncating embedding input from {len(tokens)} tokens")
+                text = self.encoding.decode(tokens[:max_tokens])
+                tokens = tokens[:max_tokens]
+            prepared.append(text)
+            token_counts.append(max(len(tokens), 1))
+        return prepared, token_counts
+
+    def _make_batches(self, token_counts: list[int]) -> list[tuple[int, int]]:
+        batches: list[tuple[int, int]] = []
+        start, batch_tokens = 0, 0
+        for index, tokens in enumerate(token_counts):
+            if index > start and (
+                batch_tokens + tokens > self.config.batch_max_tokens
+                or index - start >= self.config.batch_max_inputs
+            ):
+                batches.append((start, index))
+                start, batch_tokens = index, 0
+            batch_tokens += tokens
+        batches.append((start, len(token_counts)))
+        return batches
+
+    async def _embed_batch(self, texts: list[str], tokens: int) -> list[list[float]]:
+        attempt = 0
+        while True:
+            backoff = 0.0
+            async with self._semaphore:
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(tokens)
+                try:
+                    raw = await self.client.embeddings.with_raw_response.create(
+                        model=self.model, input=texts
+                    )
+                except RateLimitError as e:
+                    # Cota esgotada também volta como 429, mas não adianta esperar
+                    if attempt >= self.config.max_retries or e.code == "insufficient_quota":
+                        raise
+                    delay = self._retry_delay(e.response.headers, attempt)
+                    self.request_bucket.pause(delay)
+                    self.token_bucket.pause(delay)
+                    self.rate_limited += 1
+                    logger.warning(f"Embedding request rate limited, retrying in {delay:.2f}s")
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.config.max_retries:
+                        raise
+                    backoff = self._retry_delay({}, attempt)
+                    logger.warning(f"Embedding request failed ({e}), retrying in {backoff:.2f}s")
+                else:
+                    self._update_limits(raw.headers)
+                    self.requests += 1
+                    self.tokens += tokens
+                    response = raw.parse()
+                    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+            await asyncio.sleep(backoff)
+            attempt += 1
+            self.retries += 1
+
+    def _update_limits(self, headers: Mapping[str, str]) -> None:
+        self.request_bucket.update(
+            _header_number(headers, "x-ratelimit-limit-requests"),
+            _header_number(headers, "x-ratelimit-remaining-requests"),
+        )
+        self.token_bucket.update(
+            _header_number(headers, "x-ratelimit-limit-tokens"),
+            _header_number(headers, "x-ratelimit-remaining-tokens"),
+        )
+
+    def _retry_delay(self, headers: Mapping[str, str], attempt: int) -> float:
+        retry_after_ms = _header_number(headers, "retry-after-ms")
+        if retry_after_ms is not None:
+            return retry_after_ms / 1000
+        retry_after = _header_number(headers, "retry-after")
+        if retry_after is not None:
+            return retry_after
+
+        backoff = min(self.config.backoff_max, self.config.backoff_base * 2**attempt)
+        return backoff * random.uniform(0.5, 1.0)
+
+
+embedding_engine = OpenAIEmbeddingEngine()
+
+
+class LangChainEmbeddingsService:
+    def __init__(self) -> None:
+        api_key = settings.openai.api_key.get_secret_value()
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not configured")
+
+        self.embeddings = embedding_engine
+        self.embedding_model = embedding_engine.model
+
+    async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
 
     async def generate_query_embedding(self, query: str) -> list[float]:
-        embedding = await self.embeddings.aembed_query(query)
-        logger.info("Generated query embedding using LangChain")
-        return embedding
+        return await self.embeddings.aembed_query(query)
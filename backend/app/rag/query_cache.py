@@ -0,0 +1,178 @@
+"""Cache LRU com TTL para embeddings de perguntas."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from loguru import logger
+
+from app.core.config import QueryCacheConfig, settings
+from app.documents.embedding_cache import EmbeddingCache, embedding_cache
+from app.documents.schemas import QueryEmbeddingCacheStats
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    return _WHITESPACE.sub(" ", question).strip().casefold()
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of query embeddings keyed by model and normalized text.
+
+    Entries expire after ``ttl_seconds``. Concurrent misses for the same key
+    share one embedding call. With ``shared_store`` a local miss first checks
+    the Postgres embedding cache, so every worker benefits from the vectors
+    computed by the others.
+    """
+
+    def __init__(
+        self,
+        config: QueryCacheConfig | None = None,
+        backing_store: EmbeddingCache | None = None,
+    ) -> None:
+        self.config = config or settings.query_cache
+        self.backing_store = backing_store or embedding_cache
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+        self._pending: dict[tuple[str, str], asyncio.Future[list[float]]] = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    async def get_or_embed(
+        self, model: str, question: str, embed: Callable[[str], Awaitable[list[float]]]
+    ) -> list[float]:
+        """Return the embedding of ``question``, calling ``embed`` on a cache miss.
+
+        The normalized question is only the cache key: a miss embeds the question
+        as it was asked, and later variants of it reuse that vector.
+        """
+        if not self.config.enabled:
+            return await embed(question)
+
+        key = (model, normalize_question(question))
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            del self._entries[key]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[list[float]] = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            embedding = await self._load(key, question, embed)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção nunca lida quando ninguém mais esperava
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+        future.set_result(embedding)
+        self._put(key, embedding)
+        return embedding
+
+    async def get_or_embed_many(
+        self,
+        model: str,
+        questions: list[str],
+        embed_many: Callable[[list[str]], Awaitable[list[list[float]]]],
+    ) -> list[list[float]]:
+        """Embed several questions, sending only the cache misses in one ``embed_many`` call."""
+        if not self.config.enabled:
+            return await embed_many(questions)
+
+        texts = [normalize_question(question) for question in questions]
+        # Primeira forma de cada pergunta, a que é enviada ao modelo num miss
+        originals: dict[str, str] = {}
+        for text, question in zip(texts, questions, strict=True):
+            originals.setdefault(text, question)
+
+        found: dict[str, list[float]] = {}
+        now = time.monotonic()
+        for text in originals:
+            entry = self._entries.get((model, text))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((model, text))
+                found[text] = entry[1]
+
+        missing = [text for text in originals if text not in found]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            embeddings = await embed_many([originals[text] for text in missing])
+            for text, embedding in zip(missing, embeddings, strict=True):
+                found[text] = embedding
+                self._put((model, text), embedding)
+
+        return [found[text] for text in texts]
+
+    def stats(self) -> QueryEmbeddingCacheStats:
+        lookups = self.hits + self.shared_hits + self.misses
+        return QueryEmbeddingCacheStats(
+            enabled=self.config.enabled,
+            hits=self.hits,
+            shared_hits=self.shared_hits,
+            misses=self.misses,
+            hit_rate=round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            entries=len(self._entries),
+            max_entries=self.config.max_entries,
+        )
+
+    async def _load(
+        self,
+        key: tuple[str, str],
+        question: str,
+        embed: Callable[[str], Awaitable[list[float]]],
+    ) -> list[float]:
+        model, text = key
+        # O vetor é da pergunta original, não do texto da chave: prefixo próprio
+        # para não colidir com chunks de documentos de mesmo conteúdo
+        store_key = self.backing_store.key(f"query:{text}")
+
+        if self.config.shared_store:
+            try:
+                found = await self.backing_store.lookup(model, [store_key])
+            except Exception as e:
+                logger.warning(f"Shared query embedding lookup failed: {e}")
+                found = {}
+            if store_key in found:
+                self.shared_hits += 1
+                return found[store_key]
+
+        self.misses += 1
+        embedding = await embed(question)
+
+        if self.config.shared_store:
+            try:
+                await self.backing_store.store(model, {store_key: embedding})
+            except Exception as e:
+                logger.warning(f"Shared query embedding write failed: {e}")
+
+        return embedding
+
+    def _put(self, key: tuple[str, str], embedding: list[float]) -> None:
+        self._entries[key] = (time.monotonic() + self.config.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+
+query_embedding_cache = QueryEmbeddingCache()
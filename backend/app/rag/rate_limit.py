@@ -0,0 +1,55 @@
+"""Token bucket assíncrono para respeitar os limites da API."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket holding up to ``capacity`` units, refilled over ``period`` seconds.
+
+    Callers wait in FIFO order until enough units are available. The bucket can
+    be realigned with the limits reported by the server and paused after the
+    server rejected a request.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0) -> None:
+        self.capacity = float(capacity)
+        self.period = period
+        self.level = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    async def acquire(self, amount: float) -> None:
+        # Um pedido maior que a capacidade nunca caberia no balde
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def update(self, limit: float | None, remaining: float | None) -> None:
+        """Adopt the limit and remaining budget reported by the server."""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining), self.capacity)
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket so that nothing is acquired for ``seconds``."""
+        self._refill()
+        self.level = min(self.level, -self.rate * seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated_at) * self.rate)
+        self._updated_at = now
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.base_models import BaseSchema
+from app.core.config import SearchMode, settings
 
 
 class SourceChunk(BaseSchema):
@@ -28,6 +29,38 @@ class RAGQuestionResponse(BaseSchema):
     processing_time_ms: int
     method: str
     created_at: datetime
+    cached: bool = False
+    cache_similarity: float | None = None  # 1.0 for the same question, lower for a paraphrase
+
+
+class RAGStreamSources(BaseSchema):
+    source_chunks: list[SourceChunk]
+    retrieval_time_ms: int
+
+
+class RAGStreamDone(BaseSchema):
+    retrieval_time_ms: int
+    first_token_ms: int | None
+    processing_time_ms: int
+    method: str
+    cached: bool = False
+
+
+class RAGBatchAnswer(BaseSchema):
+    index: int
+    question: str
+    answer: str
+    source_chunks: list[SourceChunk]
+    processing_time_ms: int
+    cached: bool = False
+
+
+class RAGBatchDone(BaseSchema):
+    questions: int
+    failed: int
+    embedding_time_ms: int
+    retrieval_time_ms: int
+    processing_time_ms: int
 
 
 class DocumentDeleteResult(BaseSchema):
@@ -64,3 +97,9 @@ class QuestionRequest(BaseModel):
     question: str
     document_id: int | None = None
     max_chunks: int = 3
+    search_mode: SearchMode | None = None  # defaults to PGVECTOR__SEARCH_MODE
+
+
+class BatchQuestionRequest(BaseModel):
+    questions: list[str] = Field(min_length=1, max_length=settings.question_batch.max_questions)
+    max_chunks: int = 3
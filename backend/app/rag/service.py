@@ -1,128 +1,440 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import time
+from collections.abc import AsyncIterator
 from datetime import datetime
 from typing import Any
 
 from langchain.chains import RetrievalQA
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from loguru import logger
 
-from app.core.vector_store import LangChainPGVectorService
+from app.core.config import SearchMode, settings
+from app.core.vector_store import PGVectorService
+from app.rag.answer_cache import AnswerScope, CachedAnswer, answer_cache
+from app.rag.context import ContextAssembler, PackedContext
 from app.rag.embeddings import LangChainEmbeddingsService
 from app.rag.llm import LangChainLLMService
 from app.rag.prompts import get_rag_prompt
 from app.rag.schemas import (
     DocumentDeleteResult,
+    RAGBatchAnswer,
+    RAGBatchDone,
     RAGQuestionResponse,
+    RAGStreamDone,
+    RAGStreamSources,
     SourceChunk,
 )
 
+# Mudar o prompt ou a montagem do contexto invalida as respostas em cache
+PROMPT_VERSION = hashlib.sha256(
+    (get_rag_prompt().template + settings.context.model_dump_json()).encode()
+).hexdigest()[:12]
+
+
+def _source_chunks(results: list[dict]) -> list[SourceChunk]:
+    return [
+        SourceChunk(
+            content=result["content"],
+            document_id=result["document_id"],
+            chunk_id=result["chunk_id"],
+            source=f"document_{result['document_id']}_chunk_{result['chunk_id']}",
+        )
+        for result in results
+    ]
+
+
+class DocumentFilteredRetriever(BaseRetriever):
+    """Retriever over :class:`PGVectorService`, optionally restricted to one document."""
+
+    vector_service: Any
+    context_assembler: Any
+    document_id: int | None = None
+    max_chunks: int = 3
+    search_mode: SearchMode | None = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(self._search(query))
+        finally:
+            loop.close()
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return await self._search(query)
+
+    async def _search(self, query: str) -> list[Document]:
+        results = await self.vector_service.search_similar(
+            query,
+            document_id=self.document_id,
+            limit=self.context_assembler.candidate_count(self.max_chunks),
+            search_mode=self.search_mode,
+        )
+        # O embedding da pergunta já está no cache de consultas
+        query_embedding = (
+            await self.vector_service.embedding_function.aembed_query(query)
+            if self.context_assembler.mmr_enabled
+            else None
+        )
+        context = await self.context_assembler.build(results, self.max_chunks, query_embedding)
+
+        # Um documento por trecho: o chain "stuff" os junta com "\n\n", como o PackedContext
+        return [
+            Document(
+                page_content=passage.content,
+                metadata={
+                    "document_id": passage.document_id,
+                    "chunk_id": passage.chunks[0]["chunk_id"],
+                    "source": passage.source,
+                    "chunks": passage.chunks,
+                },
+            )
+            for passage in context.passages
+        ]
+
 
 class LangChainRAGService:
     def __init__(self) -> None:
         self.llm_service = LangChainLLMService()
         self.embeddings_service = LangChainEmbeddingsService()
-        self.vector = LangChainPGVectorService(self.embeddings_service.embeddings)
+        self.vector = PGVectorService(self.embeddings_service.embeddings)
+        self.context = ContextAssembler(self.vector)
+
+        # Montada uma vez; cada pergunta só troca o retriever
+        self.qa_chain_template = RetrievalQA.from_chain_type(
+            llm=self.llm_service.llm,
+            chain_type="stuff",
+            retriever=DocumentFilteredRetriever(
+                vector_service=self.vector, context_assembler=self.context
+            ),
+            return_source_documents=True,
+            chain_type_kwargs={"prompt": get_rag_prompt()},
+        )
 
     async def ask_question(
-        self, question: str, document_id: int | None = None, max_chunks: int = 3
+        self,
+        question: str,
+        document_id: int | None = None,
+        max_chunks: int = 3,
+        search_mode: SearchMode | None = None,
     ) -> RAGQuestionResponse:
-        return await self.ask_question_with_qa_chain(question, document_id, max_chunks)
+        if not answer_cache.enabled:
+            return await self.ask_question_with_qa_chain(
+                question, document_id, max_chunks, search_mode
+            )
 
-    async def delete_document_data(self, document_id: int) -> DocumentDeleteResult:
-        deleted_count = await self.vector.delete_document_chunks(document_id)
+        start_time = time.perf_counter()
+        scope, embedding, cached = await self._lookup_answer(
+            question, document_id, max_chunks, search_mode
+        )
+        if cached is not None:
+            entry, similarity = cached
+            return RAGQuestionResponse(
+                question=question,
+                answer=entry.answer,
+                source_chunks=entry.source_chunks,
+                processing_time_ms=int((time.perf_counter() - start_time) * 1000),
+                method="answer_cache",
+                created_at=datetime.now(),
+                cached=True,
+                cache_similarity=round(similarity, 4),
+            )
 
-        return DocumentDeleteResult(
+        response = await self.ask_question_with_qa_chain(
+            question, document_id, max_chunks, search_mode
+        )
+        answer_cache.put(scope, question, response.answer, response.source_chunks, embedding)
+        return response
+
+    async def _lookup_answer(
+        self,
+        question: str,
+        document_id: int | None,
+        max_chunks: int,
+        search_mode: SearchMode | None,
+    ) -> tuple[AnswerScope, list[float] | None, tuple[CachedAnswer, float] | None]:
+        scope = await self._answer_scope(document_id, max_chunks, search_mode)
+        # A retrieval usa o mesmo embedding, que fica no cache de perguntas
+        embedding = (
+            await self.embeddings_service.generate_query_embedding(question)
+            if answer_cache.semantic
+            else None
+        )
+        return scope, embedding, answer_cache.get(scope, question, embedding)
+
+    async def _answer_scope(
+        self, document_id: int | None, max_chunks: int, search_mode: SearchMode | None
+    ) -> AnswerScope:
+        return AnswerScope(
             document_id=document_id,
-            chunks_deleted=deleted_count,
-            status="success",
+            content_version=await self.vector.content_version(document_id),
+            model=settings.openai.model,
+            prompt_version=PROMPT_VERSION,
+            max_chunks=max_chunks,
+            search_mode=search_mode or settings.pgvector.search_mode,
         )
 
-    async def create_retrieval_qa_chain(
-        self, document_id: int | None = None, max_chunks: int = 3
-    ) -> RetrievalQA:
-        await self.vector.initialize()
+    async def stream_question(
+        self,
+        question: str,
+        document_id: int | None = None,
+        max_chunks: int = 3,
+        search_mode: SearchMode | None = None,
+    ) -> AsyncIterator[tuple[str, RAGStreamSources | RAGStreamDone | dict[str, str]]]:
+        """Yield ``(event, data)`` pairs: the sources, each answer token, then timings.
 
-        class DocumentFilteredRetriever(BaseRetriever):
-            vector_service: Any
-            document_id: int
-            max_chunks: int
+        The prompt is the same one the RetrievalQA "stuff" chain builds, so the
+        streamed answer matches the non-streaming endpoint.
+        """
+        start_time = time.perf_counter()
 
-            def __init__(self, vector_service, document_id, max_chunks):
-                super().__init__(
-                    vector_service=vector_service, document_id=document_id, max_chunks=max_chunks
+        if answer_cache.enabled:
+            scope, embedding, cached = await self._lookup_answer(
+                question, document_id, max_chunks, search_mode
+            )
+            if cached is not None:
+                entry = cached[0]
+                lookup_time = int((time.perf_counter() - start_time) * 1000)
+                yield (
+                    "sources",
+                    RAGStreamSources(
+                        source_chunks=entry.source_chunks, retrieval_time_ms=lookup_time
+                    ),
                 )
-
-            def _get_relevant_documents(self, query: str) -> list[Document]:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    return loop.run_until_complete(self._aget_relevant_documents(query))
-                finally:
-                    loop.close()
-
-            async def _aget_relevant_documents(self, query: str) -> list[Document]:
-                results = await self.vector_service.search_similar(
-                    query, document_id=self.document_id, limit=self.max_chunks
+                yield "token", {"content": entry.answer}
+                yield (
+                    "done",
+                    RAGStreamDone(
+                        retrieval_time_ms=lookup_time,
+                        first_token_ms=lookup_time,
+                        processing_time_ms=int((time.perf_counter() - start_time) * 1000),
+                        method="answer_cache",
+                        cached=True,
+                    ),
                 )
+                return
+
+        results = await self.vector.search_similar(
+            question,
+            document_id=document_id,
+            limit=self.context.candidate_count(max_chunks),
+            search_mode=search_mode,
+        )
+        context = await self._build_context(question, results, max_chunks)
+        retrieval_time = int((time.perf_counter() - start_time) * 1000)
+        source_chunks = _source_chunks(context.results)
+        yield (
+            "sources",
+            RAGStreamSources(source_chunks=source_chunks, retrieval_time_ms=retrieval_time),
+        )
 
-                documents = []
-                for result in results:
-                    doc = Document(
-                        page_content=result["content"],
-                        metadata={
-                            "document_id": result["document_id"],
-                            "chunk_id": result["chunk_id"],
-                            "source": (
-                                f"document_{result['document_id']}_" f"chunk_{result['chunk_id']}"
-                            ),
-                        },
+        prompt = get_rag_prompt().format(context=context.text, question=question)
+        first_token_ms = None
+        answer_parts = []
+        async for chunk in self.llm_service.llm.astream(prompt):
+            content = chunk.content if isinstance(chunk.content, str) else ""
+            if not content:
+                continue
+            if first_token_ms is None:
+                first_token_ms = int((time.perf_counter() - start_time) * 1000)
+            answer_parts.append(content)
+            yield "token", {"content": content}
+
+        if answer_cache.enabled:
+            answer_cache.put(scope, question, "".join(answer_parts), source_chunks, embedding)
+
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        logger.info(
+            f"Streamed answer with {len(source_chunks)} source chunks, first token after "
+            f"{first_token_ms}ms, finished after {processing_time}ms"
+        )
+        yield (
+            "done",
+            RAGStreamDone(
+                retrieval_time_ms=retrieval_time,
+                first_token_ms=first_token_ms,
+                processing_time_ms=processing_time,
+                method="langchain_streaming",
+            ),
+        )
+
+    async def _build_context(
+        self, question: str, results: list[dict], max_chunks: int
+    ) -> PackedContext:
+        query_embedding = (
+            await self.embeddings_service.generate_query_embedding(question)
+            if self.context.mmr_enabled
+            else None
+        )
+        return await self.context.build(results, max_chunks, query_embedding)
+
+    async def stream_batch(
+        self, document_id: int, questions: list[str], max_chunks: int = 3
+    ) -> AsyncIterator[tuple[str, RAGBatchAnswer | RAGBatchDone | dict[str, Any]]]:
+        """Answer many questions about one document, yielding answers as they finish.
+
+        All questions are embedded in one request and searched in one query;
+        only the LLM calls run separately, at most ``llm_concurrency`` at a time.
+        """
+        start_time = time.perf_counter()
+
+        embeddings = await self.embeddings_service.embeddings.aembed_queries(questions)
+        embedding_time = int((time.perf_counter() - start_time) * 1000)
+
+        # Busca vetorial: o modo híbrido não tem versão em lote
+        scope = (
+            await self._answer_scope(document_id, max_chunks, "vector")
+            if answer_cache.enabled
+            else None
+        )
+        searches = await self.vector.search_document_batch(
+            document_id, embeddings, self.context.candidate_count(max_chunks)
+        )
+        # Uma só consulta traz os embeddings dos candidatos de todas as perguntas
+        candidate_embeddings = await self.context.load_embeddings(
+            [result for results in searches for result in results]
+        )
+        retrieval_time = int((time.perf_counter() - start_time) * 1000) - embedding_time
+
+        semaphore = asyncio.Semaphore(settings.question_batch.llm_concurrency)
+        prompt_template = get_rag_prompt()
+
+        async def _answer(index: int) -> RAGBatchAnswer:
+            question_start = time.perf_counter()
+            question, embedding, results = questions[index], embeddings[index], searches[index]
+
+            if scope is not None:
+                cached = answer_cache.get(scope, question, embedding)
+                if cached is not None:
+                    return RAGBatchAnswer(
+                        index=index,
+                        question=question,
+                        answer=cached[0].answer,
+                        source_chunks=cached[0].source_chunks,
+                        processing_time_ms=int((time.perf_counter() - question_start) * 1000),
+                        cached=True,
                     )
-                    documents.append(doc)
 
-                return documents
+            context = self.context.pack(results, max_chunks, embedding, candidate_embeddings)
+            prompt = prompt_template.format(context=context.text, question=question)
+            async with semaphore:
+                message = await self.llm_service.llm.ainvoke(prompt)
+            answer = message.content if isinstance(message.content, str) else str(message.content)
+            source_chunks = _source_chunks(context.results)
+            if scope is not None:
+                answer_cache.put(scope, question, answer, source_chunks, embedding)
 
-        if document_id is not None:
-            retriever = DocumentFilteredRetriever(self.vector, document_id, max_chunks)
-        else:
-            retriever_kwargs: dict[str, Any] = {"k": max_chunks}
-            retriever = self.vector.as_retriever(**retriever_kwargs)
+            return RAGBatchAnswer(
+                index=index,
+                question=question,
+                answer=answer,
+                source_chunks=source_chunks,
+                processing_time_ms=int((time.perf_counter() - question_start) * 1000),
+            )
 
-        enhanced_prompt = get_rag_prompt()
+        async def _run(index: int) -> tuple[int, RAGBatchAnswer | Exception]:
+            try:
+                return index, await _answer(index)
+            except Exception as e:
+                return index, e
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm_service.llm,
-            chain_type="stuff",
-            retriever=retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": enhanced_prompt},
+        tasks = [asyncio.create_task(_run(index)) for index in range(len(questions))]
+        failed = 0
+        try:
+            for completed in asyncio.as_completed(tasks):
+                index, result = await completed
+                if isinstance(result, Exception):
+                    failed += 1
+                    logger.error(
+                        f"Batch question {index} failed for document {document_id}: {result}"
+                    )
+                    yield (
+                        "error",
+                        {"index": index, "question": questions[index], "detail": str(result)},
+                    )
+                else:
+                    yield "answer", result
+        finally:
+            # Cliente desconectado: não gasta chamadas ao LLM que ninguém vai ler
+            for task in tasks:
+                task.cancel()
+
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        logger.info(
+            f"Answered {len(questions) - failed}/{len(questions)} questions for document "
+            f"{document_id} in {processing_time}ms"
+        )
+        yield (
+            "done",
+            RAGBatchDone(
+                questions=len(questions),
+                failed=failed,
+                embedding_time_ms=embedding_time,
+                retrieval_time_ms=retrieval_time,
+                processing_time_ms=processing_time,
+            ),
         )
 
-        return qa_chain
+    async def delete_document_data(self, document_id: int) -> DocumentDeleteResult:
+        deleted_count = await self.vector.delete_document_chunks(document_id)
+        answer_cache.invalidate_document(document_id)
+
+        return DocumentDeleteResult(
+            document_id=document_id,
+            chunks_deleted=deleted_count,
+            status="success",
+        )
+
+    async def create_retrieval_qa_chain(
+        self,
+        document_id: int | None = None,
+        max_chunks: int = 3,
+        search_mode: SearchMode | None = None,
+    ) -> RetrievalQA:
+        # Cópia rasa do modelo: prompt, LLM e cliente HTTP continuam compartilhados
+        retriever = DocumentFilteredRetriever(
+            vector_service=self.vector,
+            context_assembler=self.context,
+            document_id=document_id,
+            max_chunks=max_chunks,
+            search_mode=search_mode,
+        )
+        return self.qa_chain_template.model_copy(update={"retriever": retriever})
 
     async def ask_question_with_qa_chain(
-        self, question: str, document_id: int | None = None, max_chunks: int = 3
+        self,
+        question: str,
+        document_id: int | None = None,
+        max_chunks: int = 3,
+        search_mode: SearchMode | None = None,
     ) -> RAGQuestionResponse:
         start_time = time.perf_counter()
 
-        qa_chain = await self.create_retrieval_qa_chain(document_id, max_chunks)
+        qa_chain = await self.create_retrieval_qa_chain(document_id, max_chunks, search_mode)
 
         result = await qa_chain.ainvoke({"query": question})
 
         processing_time = int((time.perf_counter() - start_time) * 1000)
 
-        source_chunks = [
-            SourceChunk(
-                content=doc.page_content,
-                document_id=doc.metadata.get("document_id", 0),
-                chunk_id=doc.metadata.get("chunk_id", 0),
-                source=doc.metadata.get("source"),
-            )
-            for doc in result.get("source_documents", [])
-        ]
+        source_chunks = _source_chunks(
+            [
+                chunk
+                for doc in result.get("source_documents", [])
+                for chunk in doc.metadata["chunks"]
+            ]
+        )
 
         logger.info(f"LangChain RAG processed question with {len(source_chunks)} source chunks")
 
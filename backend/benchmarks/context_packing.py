@@ -0,0 +1,123 @@
+"""Measure prompt context tokens with and without context assembly.
+
+Usage::
+
+    uv run python -m benchmarks.context_packing --queries 100 --max-chunks 5
+
+Query vectors are chunk embeddings sampled from ``document_chunks`` with a
+little Gaussian noise, so no embedding API calls are made. Each query runs a
+per-document search and compares the chunks pasted as they were, as the
+"stuff" chain used to do, with the packed context of every configuration.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.vector_index import CHUNK_TABLE
+from app.core.vector_store import PGVectorService
+from app.rag.context import PASSAGE_SEPARATOR, ContextAssembler
+from app.rag.embeddings import embedding_engine
+
+
+async def sample_queries(count: int, noise: float) -> list[tuple[int, list[float]]]:
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text(
+                f"SELECT document_id, CAST(embedding AS real[]) AS embedding FROM {CHUNK_TABLE} "
+                "ORDER BY random() LIMIT :n"
+            ),
+            {"n": count},
+        )
+        return [
+            (row.document_id, [value + random.gauss(0, noise) for value in row.embedding])
+            for row in rows
+        ]
+
+
+async def bench_config(
+    name: str,
+    store: PGVectorService,
+    queries: list[tuple[int, list[float]]],
+    max_chunks: int,
+    **overrides: object,
+) -> None:
+    assembler = ContextAssembler(store, settings.context.model_copy(update=overrides))
+    naive_tokens, packed_tokens, latencies = [], [], []
+    for document_id, embedding in queries:
+        results = await store.search_by_vector(
+            embedding, document_id, assembler.candidate_count(max_chunks)
+        )
+        naive = PASSAGE_SEPARATOR.join(result["content"] for result in results[:max_chunks])
+        naive_tokens.append(len(assembler.encoding.encode(naive)))
+
+        start = time.perf_counter()
+        packed = await assembler.build(results, max_chunks, embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+        packed_tokens.append(packed.tokens)
+
+    saved = 1 - sum(packed_tokens) / max(sum(naive_tokens), 1)
+    print(
+        f"{name:<28} {statistics.mean(naive_tokens):>9.0f} {statistics.mean(packed_tokens):>9.0f} "
+        f"{saved:>8.1%} {statistics.median(latencies):>8.2f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--max-chunks", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=settings.context.max_tokens)
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+
+    try:
+        queries = await sample_queries(args.queries, args.noise)
+        if not queries:
+            print(f"{CHUNK_TABLE} is empty, ingest some documents first")
+            return
+
+        store = PGVectorService(embedding_engine)
+        unbounded = 10**9
+        print(f"{'configuration':<28} {'naive tok':>9} {'packed':>9} {'saved':>8} {'p50 ms':>8}")
+        await bench_config(
+            "merge + overlap removal",
+            store,
+            queries,
+            args.max_chunks,
+            max_tokens=unbounded,
+            merge_adjacent=True,
+            mmr_enabled=False,
+        )
+        await bench_config(
+            "merge + budget",
+            store,
+            queries,
+            args.max_chunks,
+            max_tokens=args.max_tokens,
+            merge_adjacent=True,
+            mmr_enabled=False,
+        )
+        await bench_config(
+            "MMR + merge + budget",
+            store,
+            queries,
+            args.max_chunks,
+            max_tokens=args.max_tokens,
+            merge_adjacent=True,
+            mmr_enabled=True,
+        )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
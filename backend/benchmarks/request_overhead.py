@@ -0,0 +1,92 @@
+"""Measure the per-request cost of building services and RetrievalQA chains.
+
+Usage::
+
+    uv run python -m benchmarks.request_overhead --iterations 200
+
+Compares constructing ``LangChainRAGService`` and ``DocumentService`` on every
+request, as the dependencies used to do, with the shared instances, and
+building a ``RetrievalQA`` chain per question with copying the template. No
+API calls are made; a placeholder key is used when none is configured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+os.environ.setdefault("OPENAI__API_KEY", "sk-benchmark")
+
+from langchain.chains import RetrievalQA
+
+from app.documents.depends import get_document_service
+from app.documents.service import DocumentService
+from app.rag.depends import get_rag_service
+from app.rag.prompts import get_rag_prompt
+from app.rag.service import DocumentFilteredRetriever, LangChainRAGService
+
+
+async def measure(operation: Callable[[], Awaitable[object]], iterations: int) -> list[float]:
+    await operation()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await operation()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<38} {statistics.median(timings):>9.3f} {p95:>9.3f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    async def rag_per_request() -> object:
+        return await LangChainRAGService().create_retrieval_qa_chain(1, 3)
+
+    async def rag_shared() -> object:
+        return await get_rag_service().create_retrieval_qa_chain(1, 3)
+
+    async def document_per_request() -> object:
+        return DocumentService()
+
+    async def document_shared() -> object:
+        return get_document_service()
+
+    service = get_rag_service()
+
+    async def chain_per_question() -> object:
+        return RetrievalQA.from_chain_type(
+            llm=service.llm_service.llm,
+            chain_type="stuff",
+            retriever=DocumentFilteredRetriever(
+                vector_service=service.vector, context_assembler=service.context, document_id=1
+            ),
+            return_source_documents=True,
+            chain_type_kwargs={"prompt": get_rag_prompt()},
+        )
+
+    async def chain_template_copy() -> object:
+        return await service.create_retrieval_qa_chain(1, 3)
+
+    print(f"{'operation (ms)':<38} {'p50':>9} {'p95':>9}")
+    report("RAG service + chain, per request", await measure(rag_per_request, args.iterations))
+    report("RAG service + chain, shared", await measure(rag_shared, args.iterations))
+    report("DocumentService, per request", await measure(document_per_request, args.iterations))
+    report("DocumentService, shared", await measure(document_shared, args.iterations))
+    report("RetrievalQA built per question", await measure(chain_per_question, args.iterations))
+    report("RetrievalQA template copy", await measure(chain_template_copy, args.iterations))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
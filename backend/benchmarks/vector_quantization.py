@@ -0,0 +1,117 @@
+"""Measure recall and latency of the quantized vector search modes.
+
+Usage::
+
+    uv run python -m benchmarks.vector_quantization --queries 200 --k 5
+
+Query vectors are chunk embeddings sampled from ``document_chunks`` with a
+little Gaussian noise, so no embedding API calls are made. The ground truth
+is an exact scan; every mode and oversampling factor is compared against it.
+Missing HNSW indexes are built first and kept; ``python -m app.core.vector_index
+ensure`` or the next app startup drops the ones the configured mode does not use.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.vector_index import CHUNK_TABLE, DISTANCE_OPERATORS, VectorIndexManager
+from app.core.vector_store import PGVectorService, to_vector_literal
+from app.rag.embeddings import embedding_engine
+
+
+async def sample_queries(count: int, noise: float) -> list[list[float]]:
+    async with engine.connect() as conn:
+        rows = await conn.scalars(
+            text(f"SELECT CAST(embedding AS text) FROM {CHUNK_TABLE} ORDER BY random() LIMIT :n"),
+            {"n": count},
+        )
+        vectors = [[float(value) for value in row.strip("[]").split(",")] for row in rows]
+    return [[value + random.gauss(0, noise) for value in vector] for vector in vectors]
+
+
+async def exact_neighbours(vector: list[float], k: int) -> set[tuple[int, int]]:
+    operator = DISTANCE_OPERATORS[settings.pgvector.distance_metric]
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text(
+                f"SELECT document_id, chunk_index FROM {CHUNK_TABLE} "
+                f"ORDER BY (embedding {operator} CAST(:embedding AS vector)) + 0 LIMIT :k"
+            ),
+            {"embedding": to_vector_literal(vector), "k": k},
+        )
+        return {(row.document_id, row.chunk_index) for row in rows}
+
+
+async def bench_mode(
+    mode: str,
+    oversample: int,
+    queries: list[list[float]],
+    truth: list[set[tuple[int, int]]],
+    k: int,
+) -> None:
+    config = settings.pgvector.model_copy(
+        update={"quantization": mode, "rerank_oversample": oversample}
+    )
+    store = PGVectorService(embedding_engine, config=config)
+
+    recalls, latencies = [], []
+    for vector, expected in zip(queries, truth, strict=True):
+        start = time.perf_counter()
+        results = await store.search_by_vector(vector, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {(result["document_id"], result["chunk_id"]) for result in results}
+        recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{mode:<8} {oversample:>10} {statistics.mean(recalls):>9.3f} "
+        f"{statistics.median(latencies):>8.2f} {p95:>8.2f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--modes", nargs="+", default=["none", "halfvec", "binary"])
+    parser.add_argument("--oversample", nargs="+", type=int, default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    try:
+        queries = await sample_queries(args.queries, args.noise)
+        if not queries:
+            print(f"{CHUNK_TABLE} is empty, ingest some documents first")
+            return
+        truth = [await exact_neighbours(vector, args.k) for vector in queries]
+
+        for mode in args.modes:
+            config = settings.pgvector.model_copy(update={"quantization": mode})
+            await VectorIndexManager(config=config).ensure_indexes(drop_stale=False)
+
+        sizes = {index["name"]: index["size"] for index in await VectorIndexManager().status()}
+        for name, size in sizes.items():
+            print(f"{name:<45} {size:>10}")
+        print()
+
+        recall = f"recall@{args.k}"
+        print(f"{'mode':<8} {'oversample':>10} {recall:>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in args.modes:
+            for oversample in [1] if mode == "none" else args.oversample:
+                await bench_mode(mode, oversample, queries, truth, args.k)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
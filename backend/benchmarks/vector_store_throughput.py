@@ -0,0 +1,160 @@
+"""Compare insert and search throughput of the LangChain PGVector wrapper and PGVectorService.
+
+Usage::
+
+    uv run python -m benchmarks.vector_store_throughput --documents 50 --chunks 40
+
+Both stores write random vectors into the configured database, so no
+embedding API calls are made. LangChain uses a throwaway collection and the
+native store writes to ``document_chunks`` under throwaway documents. Searches run with
+``--concurrency`` questions in flight to show how each store behaves under load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from uuid import uuid4
+
+from langchain_community.vectorstores import PGVector
+from langchain_community.vectorstores.pgvector import DistanceStrategy
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.vector_store import PGVectorService
+
+
+class RandomEmbeddings(Embeddings):
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return [random.uniform(-1, 1) for _ in range(self.dimension)]
+
+
+async def run_concurrently(
+    operations: list[Callable[[], Awaitable[object]]], concurrency: int
+) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(operation: Callable[[], Awaitable[object]]) -> None:
+        async with semaphore:
+            await operation()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_run(operation) for operation in operations))
+    return time.perf_counter() - start
+
+
+def report(name: str, operation: str, count: int, elapsed: float) -> None:
+    print(f"{name:<10} {operation:<8} {count:>7} in {elapsed:7.2f}s  {count / elapsed:9.1f}/s")
+
+
+async def bench_langchain(args: argparse.Namespace, embeddings: RandomEmbeddings) -> None:
+    loop = asyncio.get_running_loop()
+    store = await loop.run_in_executor(
+        None,
+        lambda: PGVector(
+            connection_string=settings.database.url.replace(
+                "postgresql+asyncpg://", "postgresql://"
+            ),
+            embedding_function=embeddings,
+            collection_name=f"benchmark_{uuid4().hex}",
+            distance_strategy=DistanceStrategy.COSINE,
+        ),
+    )
+
+    def _insert(document_id: int) -> Callable[[], Awaitable[object]]:
+        chunks = [f"chunk {i} of document {document_id}" for i in range(args.chunks)]
+        return lambda: loop.run_in_executor(
+            None,
+            lambda: store.add_embeddings(
+                texts=chunks,
+                embeddings=embeddings.embed_documents(chunks),
+                metadatas=[{"document_id": document_id, "chunk_id": i} for i in range(len(chunks))],
+            ),
+        )
+
+    def _search() -> Callable[[], Awaitable[object]]:
+        vector = embeddings.embed_query("")
+        filter_kwargs = {"filter": {"document_id": random.randrange(args.documents)}}
+        return lambda: loop.run_in_executor(
+            None,
+            lambda: store.similarity_search_with_score_by_vector(vector, k=5, **filter_kwargs),
+        )
+
+    try:
+        elapsed = await run_concurrently(
+            [_insert(i) for i in range(args.documents)], args.concurrency
+        )
+        report("langchain", "chunks", args.documents * args.chunks, elapsed)
+        elapsed = await run_concurrently([_search() for _ in range(args.queries)], args.concurrency)
+        report("langchain", "searches", args.queries, elapsed)
+    finally:
+        await loop.run_in_executor(None, store.delete_collection)
+
+
+async def bench_native(args: argparse.Namespace, embeddings: RandomEmbeddings) -> None:
+    store = PGVectorService(embeddings)
+    file_name = f"benchmark_{uuid4().hex}"
+
+    # document_chunks referencia documents, então cada documento precisa existir
+    async with engine.begin() as conn:
+        document_ids = list(
+            await conn.scalars(
+                text(
+                    "INSERT INTO documents (file_name, file_path, text_content) "
+                    "SELECT :file_name, '', '' FROM generate_series(1, :count) RETURNING id"
+                ),
+                {"file_name": file_name, "count": args.documents},
+            )
+        )
+
+    def _insert(document_id: int) -> Callable[[], Awaitable[object]]:
+        chunks = [f"chunk {i} of document {document_id}" for i in range(args.chunks)]
+        vectors = embeddings.embed_documents(chunks)
+        return lambda: store.add_document_chunks(document_id, chunks, vectors)
+
+    def _search() -> Callable[[], Awaitable[object]]:
+        vector = embeddings.embed_query("")
+        return lambda: store.search_by_vector(vector, random.choice(document_ids), 5)
+
+    try:
+        elapsed = await run_concurrently([_insert(i) for i in document_ids], args.concurrency)
+        report("native", "chunks", args.documents * args.chunks, elapsed)
+        elapsed = await run_concurrently([_search() for _ in range(args.queries)], args.concurrency)
+        report("native", "searches", args.queries, elapsed)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("DELETE FROM documents WHERE file_name = :file_name"),
+                {"file_name": file_name},
+            )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per document")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    embeddings = RandomEmbeddings(settings.pgvector.embedding_dimension)
+    try:
+        await bench_langchain(args, embeddings)
+        await bench_native(args, embeddings)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+import pytest
+
+from app.core.db import connect_database, engine
+
+
+@pytest.fixture
+async def database() -> AsyncIterator[None]:
+    """Create the schema in the configured database, skipping the test without one."""
+    try:
+        await connect_database()
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    yield
+    # O pool fica preso ao event loop do teste
+    await engine.dispose()
+
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding with one token per whitespace-separated word."""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+    def encode_ordinary_batch(self, texts: list[str]) -> list[list[str]]:
+        return [self.encode(text) for text in texts]
+
+    def decode(self, tokens: list[str]) -> str:
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def word_encoding() -> WordEncoding:
+    return WordEncoding()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.core.config import settings
+from app.rag.answer_cache import AnswerCache, AnswerScope
+from app.rag.schemas import SourceChunk
+
+
+def _scope(document_id: int | None = 1, **overrides: Any) -> AnswerScope:
+    values: dict[str, Any] = {
+        "document_id": document_id,
+        "content_version": "3:42",
+        "model": "gpt-4o-mini",
+        "prompt_version": "abc",
+        "max_chunks": 3,
+        "search_mode": "vector",
+        **overrides,
+    }
+    return AnswerScope(**values)
+
+
+def _cache(**overrides: Any) -> AnswerCache:
+    return AnswerCache(settings.answer_cache.model_copy(update={"enabled": True, **overrides}))
+
+
+SOURCES = [SourceChunk(content="chunk", document_id=1, chunk_id=0, source="document_1_chunk_0")]
+
+
+def test_exact_hit_with_normalized_question() -> None:
+    cache = _cache()
+    cache.put(_scope(), "What is the  due date?", "June 1st", SOURCES)
+
+    hit = cache.get(_scope(), "what is the due date? ")
+
+    assert hit is not None
+    assert hit[0].answer == "June 1st"
+    assert hit[1] == 1.0
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_in_another_scope() -> None:
+    cache = _cache()
+    cache.put(_scope(), "question", "answer", SOURCES)
+
+    assert cache.get(_scope(content_version="4:43"), "question") is None
+    assert cache.get(_scope(document_id=2), "question") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_semantic_hit_above_threshold() -> None:
+    cache = _cache(semantic_enabled=True, similarity_threshold=0.9)
+    cache.put(_scope(), "When is the rent due?", "On the 5th", SOURCES, embedding=[1.0, 0.0])
+
+    hit = cache.get(_scope(), "What day must rent be paid?", embedding=[0.95, 0.05])
+
+    assert hit is not None
+    assert hit[0].answer == "On the 5th"
+    assert 0.9 <= hit[1] < 1.0
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_semantic_miss_below_threshold() -> None:
+    cache = _cache(semantic_enabled=True, similarity_threshold=0.9)
+    cache.put(_scope(), "When is the rent due?", "On the 5th", SOURCES, embedding=[1.0, 0.0])
+
+    assert cache.get(_scope(), "Who is the landlord?", embedding=[0.0, 1.0]) is None
+
+
+def test_semantic_matching_disabled() -> None:
+    cache = _cache(semantic_enabled=False)
+    cache.put(_scope(), "When is the rent due?", "On the 5th", SOURCES, embedding=[1.0, 0.0])
+
+    assert cache.get(_scope(), "When must rent be paid?", embedding=[1.0, 0.0]) is None
+
+
+def test_expired_entries_are_not_served() -> None:
+    cache = _cache(ttl_seconds=0)
+    cache.put(_scope(), "question", "answer", SOURCES)
+
+    assert cache.get(_scope(), "question") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = _cache(max_entries=2)
+    cache.put(_scope(), "first", "1", SOURCES)
+    cache.put(_scope(), "second", "2", SOURCES)
+    assert cache.get(_scope(), "first") is not None
+
+    cache.put(_scope(), "third", "3", SOURCES)
+
+    assert cache.get(_scope(), "second") is None
+    assert cache.get(_scope(), "first") is not None
+    assert cache.get(_scope(), "third") is not None
+
+
+def test_invalidate_document_drops_its_and_cross_document_answers() -> None:
+    cache = _cache()
+    cache.put(_scope(document_id=1), "question", "document 1", SOURCES)
+    cache.put(_scope(document_id=2), "question", "document 2", SOURCES)
+    cache.put(_scope(document_id=None), "question", "all documents", SOURCES)
+
+    cache.invalidate_document(1)
+
+    assert cache.get(_scope(document_id=1), "question") is None
+    assert cache.get(_scope(document_id=None), "question") is None
+    assert cache.get(_scope(document_id=2), "question") is not None
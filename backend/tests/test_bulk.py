@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.documents.bulk import BulkIngestionPipeline
+from app.documents.schemas import BulkFileResult
+from app.documents.service import DocumentService
+
+
+def _zip(*names: str) -> UploadFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, f"content of {name}")
+    buffer.seek(0)
+    return UploadFile(buffer, filename="batch.zip")
+
+
+def _upload(name: str) -> UploadFile:
+    return UploadFile(io.BytesIO(f"content of {name}".encode()), filename=name)
+
+
+@pytest.fixture
+def pipeline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> BulkIngestionPipeline:
+    monkeypatch.setattr(settings.app, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings.bulk, "max_files", 3)
+    return BulkIngestionPipeline(DocumentService())
+
+
+def _stored_files(root: Path) -> list[Path]:
+    return [path for path in root.rglob("*") if path.is_file()]
+
+
+async def test_limit_is_checked_before_anything_is_stored(
+    pipeline: BulkIngestionPipeline, tmp_path: Path
+) -> None:
+    uploads = [_upload("a.png"), _upload("b.png"), _zip("c.png", "d.png")]
+    results: dict[int, BulkFileResult] = {}
+
+    with pytest.raises(ValueError, match="limited to 3 files, got 4"):
+        await pipeline._store_uploads(uploads, results)
+
+    # Os arquivos avulsos vêm antes do zip, mas nada pode ter sido gravado
+    assert _stored_files(tmp_path) == []
+    assert results == {}
+
+
+async def test_directories_and_hidden_members_do_not_count(
+    pipeline: BulkIngestionPipeline, tmp_path: Path
+) -> None:
+    uploads = [_upload("a.png"), _zip("docs/", "docs/b.png", "docs/.DS_Store", "c.png")]
+    results: dict[int, BulkFileResult] = {}
+
+    stored = await pipeline._store_uploads(uploads, results)
+
+    assert [file.file_name for file in stored] == ["a.png", "docs/b.png", "c.png"]
+    assert [file.index for file in stored] == [0, 1, 2]
+    assert len(_stored_files(tmp_path)) == 3
+    assert results == {}
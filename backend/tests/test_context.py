@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from app.core.config import settings
+from app.rag.context import MIN_OVERLAP_CHARS, ContextAssembler, overlap_length
+
+
+def _assembler(encoding: Any, **overrides: Any) -> ContextAssembler:
+    config = settings.context.model_copy(update={"mmr_enabled": False, **overrides})
+    # O armazenamento só é usado para carregar embeddings do MMR
+    assembler = ContextAssembler(vector_store=None, config=config)  # type: ignore[arg-type]
+    assembler._encoding = encoding
+    return assembler
+
+
+def _chunk(chunk_id: int, content: str, document_id: int = 1) -> dict[str, Any]:
+    return {"document_id": document_id, "chunk_id": chunk_id, "content": content}
+
+
+def test_overlap_length_finds_repeated_suffix() -> None:
+    shared = "the tenant pays the rent monthly"
+    assert overlap_length(f"Clause one says {shared}", f"{shared} in advance") == len(shared)
+
+
+def test_overlap_length_ignores_short_coincidences() -> None:
+    assert overlap_length("ends with the", "the next chunk") == 0
+    assert len("the") < MIN_OVERLAP_CHARS
+
+
+def test_overlap_length_without_overlap() -> None:
+    assert overlap_length("first chunk text", "second chunk text") == 0
+
+
+def test_pack_merges_adjacent_chunks_without_overlap(word_encoding: Any) -> None:
+    text = " ".join(f"word{index}" for index in range(60))
+    first, second = text[:250], text[150:]
+    assembler = _assembler(word_encoding, max_tokens=1000)
+
+    packed = assembler.pack([_chunk(1, second), _chunk(0, first)], max_chunks=2)
+
+    assert len(packed.passages) == 1
+    assert packed.text == text
+    assert packed.passages[0].source == "document_1_chunks_0-1"
+    assert [chunk["chunk_id"] for chunk in packed.results] == [0, 1]
+    assert packed.tokens < packed.retrieved_tokens
+
+
+def test_pack_keeps_passages_in_relevance_order(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=1000)
+
+    packed = assembler.pack(
+        [_chunk(7, "most relevant"), _chunk(2, "less relevant", document_id=2)], max_chunks=2
+    )
+
+    assert packed.text == "most relevant\n\nless relevant"
+
+
+def test_pack_without_merging(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=1000, merge_adjacent=False)
+
+    packed = assembler.pack([_chunk(0, "alpha beta"), _chunk(1, "gamma delta")], max_chunks=2)
+
+    assert [passage.source for passage in packed.passages] == [
+        "document_1_chunk_0",
+        "document_1_chunk_1",
+    ]
+
+
+def test_pack_drops_duplicate_content(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=1000)
+
+    packed = assembler.pack(
+        [_chunk(0, "same text"), _chunk(0, "same text", document_id=2)], max_chunks=2
+    )
+
+    assert packed.text == "same text"
+    assert len(packed.results) == 1
+
+
+def test_pack_respects_token_budget(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=5, merge_adjacent=False)
+
+    packed = assembler.pack(
+        [_chunk(0, "one two three"), _chunk(5, "four five six"), _chunk(9, "seven")],
+        max_chunks=3,
+    )
+
+    # O segundo trecho não cabe; o terceiro, menor, ainda entra
+    assert packed.text == "one two three\n\nseven"
+    assert packed.tokens <= 5
+
+
+def test_pack_truncates_a_single_oversized_passage(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=3)
+
+    packed = assembler.pack([_chunk(0, "one two three four five")], max_chunks=1)
+
+    assert packed.text == "one two three"
+    assert packed.tokens == 3
+
+
+def test_pack_limits_chunks(word_encoding: Any) -> None:
+    assembler = _assembler(word_encoding, max_tokens=1000, merge_adjacent=False)
+
+    packed = assembler.pack([_chunk(index, f"chunk {index}") for index in range(5)], max_chunks=2)
+
+    assert [chunk["chunk_id"] for chunk in packed.results] == [0, 1]
+
+
+def test_pack_with_mmr_prefers_diverse_chunks(word_encoding: Any) -> None:
+    assembler = _assembler(
+        word_encoding, max_tokens=1000, merge_adjacent=False, mmr_enabled=True, mmr_lambda=0.3
+    )
+    results = [_chunk(0, "best match"), _chunk(1, "near copy"), _chunk(2, "other topic")]
+    embeddings = {
+        (1, 0): [1.0, 0.0],
+        (1, 1): [0.99, 0.01],
+        (1, 2): [0.6, 0.8],
+    }
+
+    packed = assembler.pack(results, 2, query_embedding=[1.0, 0.0], embeddings=embeddings)
+
+    assert [chunk["chunk_id"] for chunk in packed.results] == [0, 2]
+
+
+@pytest.mark.parametrize(("mmr_enabled", "expected"), [(False, 3), (True, 9)])
+def test_candidate_count(word_encoding: Any, mmr_enabled: bool, expected: int) -> None:
+    assembler = _assembler(word_encoding, mmr_enabled=mmr_enabled, mmr_fetch_factor=3)
+
+    assert assembler.candidate_count(3) == expected
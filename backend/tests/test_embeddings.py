@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+import pytest
+from openai import APIConnectionError, RateLimitError
+
+from app.core.config import settings
+from app.rag.embeddings import OpenAIEmbeddingEngine
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+
+
+def _rate_limited(
+    headers: dict[str, str] | None = None, code: str = "rate_limit_exceeded"
+) -> RateLimitError:
+    response = httpx.Response(429, headers=headers or {}, request=REQUEST)
+    return RateLimitError("Rate limit reached", response=response, body={"code": code})
+
+
+def _raw_response(texts: list[str], headers: dict[str, str] | None = None) -> Any:
+    # Devolve fora de ordem, como a API pode fazer
+    data = [
+        SimpleNamespace(index=index, embedding=[float(len(text))])
+        for index, text in reversed(list(enumerate(texts)))
+    ]
+    return SimpleNamespace(headers=headers or {}, parse=lambda: SimpleNamespace(data=data))
+
+
+class FakeEmbeddings:
+    """Stands in for ``client.embeddings.with_raw_response``; fails with ``errors`` first."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls: list[list[str]] = []
+
+    async def create(self, model: str, input: list[str]) -> Any:
+        self.calls.append(input)
+        if self.errors:
+            raise self.errors.pop(0)
+        return _raw_response(input)
+
+
+def _engine(
+    monkeypatch: pytest.MonkeyPatch, fake: FakeEmbeddings, encoding: Any, **overrides: Any
+) -> OpenAIEmbeddingEngine:
+    config = settings.embedding.model_copy(update={"backoff_base": 0.001, **overrides})
+    engine = OpenAIEmbeddingEngine(config, model="text-embedding-3-small")
+    client = SimpleNamespace(embeddings=SimpleNamespace(with_raw_response=fake))
+    monkeypatch.setattr(engine, "_client", client)
+    monkeypatch.setattr(engine, "_encoding", encoding)
+    return engine
+
+
+def test_batches_split_on_token_budget_and_input_count(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    engine = _engine(
+        monkeypatch, FakeEmbeddings(), word_encoding, batch_max_tokens=10, batch_max_inputs=3
+    )
+
+    # Uma entrada acima do orçamento fica sozinha no seu lote
+    assert engine._make_batches([4, 4, 4, 1, 1, 1, 1, 12, 2]) == [
+        (0, 2),
+        (2, 5),
+        (5, 7),
+        (7, 8),
+        (8, 9),
+    ]
+
+
+def test_tokenize_truncates_long_inputs(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    engine = _engine(monkeypatch, FakeEmbeddings(), word_encoding, max_input_tokens=3)
+
+    texts, token_counts = engine._tokenize(["one two three four five", "short", ""])
+
+    assert texts == ["one two three", "short", ""]
+    assert token_counts == [3, 1, 1]
+
+
+async def test_batches_are_embedded_in_input_order(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    fake = FakeEmbeddings()
+    engine = _engine(monkeypatch, fake, word_encoding, batch_max_inputs=2)
+
+    embeddings = await engine.aembed_documents(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert embeddings == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert sorted(fake.calls) == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert engine.requests == 3
+
+
+async def test_rate_limit_pauses_the_buckets_and_retries(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    fake = FakeEmbeddings(_rate_limited({"retry-after-ms": "100"}))
+    engine = _engine(monkeypatch, fake, word_encoding)
+
+    start = time.monotonic()
+    assert await engine._embed_batch(["text"], 1) == [[4.0]]
+
+    # A espera vem dos buckets pausados, não de um sleep no laço
+    assert time.monotonic() - start >= 0.09
+    assert len(fake.calls) == 2
+    assert (engine.rate_limited, engine.retries) == (1, 1)
+
+
+async def test_insufficient_quota_is_not_retried(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    fake = FakeEmbeddings(_rate_limited(code="insufficient_quota"))
+    engine = _engine(monkeypatch, fake, word_encoding)
+
+    with pytest.raises(RateLimitError):
+        await engine._embed_batch(["text"], 1)
+
+    assert len(fake.calls) == 1
+    assert engine.rate_limited == 0
+
+
+async def test_retries_stop_at_the_limit(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    fake = FakeEmbeddings(*(APIConnectionError(request=REQUEST) for _ in range(5)))
+    engine = _engine(monkeypatch, fake, word_encoding, max_retries=2)
+
+    with pytest.raises(APIConnectionError):
+        await engine._embed_batch(["text"], 1)
+
+    assert len(fake.calls) == 3
+    assert engine.retries == 2
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after-ms": "250", "retry-after": "2"}, 0.25),
+        ({"retry-after": "2"}, 2.0),
+        ({"retry-after-ms": "soon", "retry-after": "3"}, 3.0),
+    ],
+)
+def test_retry_delay_follows_the_headers(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any, headers: dict[str, str], expected: float
+) -> None:
+    engine = _engine(monkeypatch, FakeEmbeddings(), word_encoding)
+    assert engine._retry_delay(headers, attempt=0) == expected
+
+
+def test_retry_delay_backs_off_exponentially(
+    monkeypatch: pytest.MonkeyPatch, word_encoding: Any
+) -> None:
+    engine = _engine(
+        monkeypatch, FakeEmbeddings(), word_encoding, backoff_base=0.5, backoff_max=3.0
+    )
+
+    assert 1.0 <= engine._retry_delay({}, attempt=2) <= 2.0
+    assert 1.5 <= engine._retry_delay({}, attempt=10) <= 3.0
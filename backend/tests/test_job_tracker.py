@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.documents.service import _JobTracker
+
+
+async def test_heartbeat_stops_once_the_attempt_is_superseded(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    tracker = _JobTracker(job_id=1, attempt=2, stage_timings={})
+    updates: list[dict[str, Any]] = []
+
+    async def update(**values: Any) -> bool:
+        updates.append(values)
+        # Outro worker reivindica o job depois do segundo heartbeat
+        return len(updates) < 3
+
+    monkeypatch.setattr(tracker, "update", update)
+
+    await asyncio.wait_for(tracker.heartbeat(0.001), timeout=1)
+
+    assert len(updates) == 3
+    assert all(set(values) == {"updated_at"} for values in updates)
+
+
+async def test_heartbeat_survives_database_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    tracker = _JobTracker(job_id=1, attempt=1, stage_timings={})
+    calls = 0
+
+    async def update(**values: Any) -> bool:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ConnectionError("database restarted")
+        return False
+
+    monkeypatch.setattr(tracker, "update", update)
+
+    await asyncio.wait_for(tracker.heartbeat(0.001), timeout=1)
+
+    assert calls == 2
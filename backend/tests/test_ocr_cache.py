@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from app.documents.ocr_cache import OCRCache
+
+
+def _image(color: int) -> Image.Image:
+    return Image.new("L", (16, 16), color=color)
+
+
+def test_put_and_get_round_trip(tmp_path: Path) -> None:
+    cache = OCRCache(tmp_path, max_bytes=1024)
+    key = OCRCache.key(_image(0), "por+eng")
+
+    assert cache.get(key) is None
+    cache.put(key, "texto da página")
+
+    assert cache.get(key) == "texto da página"
+    assert cache.usage() == (1, len("texto da página".encode()))
+
+
+def test_key_depends_on_pixels_and_settings() -> None:
+    key = OCRCache.key(_image(0), "por+eng")
+
+    assert key == OCRCache.key(_image(0), "por+eng")
+    assert key != OCRCache.key(_image(255), "por+eng")
+    assert key != OCRCache.key(_image(0), "eng")
+
+
+def test_evict_removes_least_recently_used(tmp_path: Path) -> None:
+    cache = OCRCache(tmp_path, max_bytes=20)
+    keys = [OCRCache.key(_image(color), "por") for color in (0, 1, 2)]
+    for age, key in enumerate(keys):
+        cache.put(key, "x" * 10)
+        path = tmp_path / key[:2] / f"{key}.txt"
+        os.utime(path, (1000 + age, 1000 + age))
+
+    # Um acerto torna a entrada mais antiga a mais recente
+    assert cache.get(keys[0]) is not None
+
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.usage() == (2, 20)
+
+
+def test_evict_without_cache_dir(tmp_path: Path) -> None:
+    cache = OCRCache(tmp_path / "missing", max_bytes=0)
+
+    assert cache.evict() == 0
+    assert cache.usage() == (0, 0)
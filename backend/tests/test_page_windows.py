@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.documents import service as service_module
+from app.documents.ocr import ocr_engine
+from app.documents.schemas import PageExtraction
+from app.documents.service import DocumentService, _page_windows
+
+
+@pytest.mark.parametrize(
+    ("page_numbers", "window", "expected"),
+    [
+        ([], 8, []),
+        ([1], 8, [(1, 1)]),
+        ([1, 2, 3, 4, 5], 8, [(1, 5)]),
+        ([1, 2, 3, 4, 5], 2, [(1, 2), (3, 4), (5, 5)]),
+        ([1, 2, 5, 6, 7, 10], 8, [(1, 2), (5, 7), (10, 10)]),
+        ([3, 4, 5], 1, [(3, 3), (4, 4), (5, 5)]),
+    ],
+)
+def test_page_windows(
+    page_numbers: list[int], window: int, expected: list[tuple[int, int]]
+) -> None:
+    assert _page_windows(page_numbers, window) == expected
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> list[tuple[str, int]]:
+    """Record the order in which windows are rendered and OCRed for a 5-page PDF."""
+    events: list[tuple[str, int]] = []
+
+    def convert_from_path(
+        pdf_path: Path, dpi: int, first_page: int, last_page: int
+    ) -> list[Image.Image]:
+        events.append(("render", first_page))
+        return [Image.new("L", (8, 8)) for _ in range(first_page, last_page + 1)]
+
+    async def ocr_pages(
+        images: list[Image.Image], first_page: int = 1, preprocessing: object = None
+    ) -> list[PageExtraction]:
+        events.append(("ocr", first_page))
+        # Dá tempo para a janela seguinte ser rasterizada em paralelo
+        await asyncio.sleep(0.05)
+        events.append(("ocr_done", first_page))
+        return [
+            PageExtraction(page_number=first_page + offset, text=f"page {first_page + offset}")
+            for offset in range(len(images))
+        ]
+
+    monkeypatch.setattr(service_module, "pdfinfo_from_path", lambda path: {"Pages": 5})
+    monkeypatch.setattr(service_module, "convert_from_path", convert_from_path)
+    monkeypatch.setattr(ocr_engine, "ocr_pages", ocr_pages)
+    monkeypatch.setattr(settings.app, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings.app, "pdf_text_layer", False)
+    monkeypatch.setattr(settings.app, "pdf_streaming", True)
+    monkeypatch.setattr(settings.app, "pdf_page_window", 2)
+    return events
+
+
+async def test_next_window_renders_during_ocr(
+    fake_pdf: list[tuple[str, int]], monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(ocr_engine, "max_workers", 1)
+
+    pages = await DocumentService()._extract_from_pdf(tmp_path / "doc.pdf")
+
+    assert [page.text for page in pages] == [f"page {n}" for n in range(1, 6)]
+    assert [first for kind, first in fake_pdf if kind == "ocr"] == [1, 3, 5]
+    assert fake_pdf.index(("render", 3)) < fake_pdf.index(("ocr_done", 1))
+    assert fake_pdf.index(("render", 5)) < fake_pdf.index(("ocr_done", 3))
+
+
+async def test_window_is_at_least_the_ocr_pool(
+    fake_pdf: list[tuple[str, int]], monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(ocr_engine, "max_workers", 4)
+
+    await DocumentService()._extract_from_pdf(tmp_path / "doc.pdf")
+
+    assert [first for kind, first in fake_pdf if kind == "ocr"] == [1, 5]
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from app.core.config import settings
+from app.rag.query_cache import QueryEmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+class Embedder:
+    """Counts calls and returns a vector derived from the exact text sent."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls: list[list[str]] = []
+
+    async def one(self, text: str) -> list[float]:
+        return (await self.many([text]))[0]
+
+    async def many(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        await asyncio.sleep(self.delay)
+        return [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+
+
+def _cache(**overrides: Any) -> QueryEmbeddingCache:
+    config = settings.query_cache.model_copy(
+        update={"enabled": True, "shared_store": False, **overrides}
+    )
+    return QueryEmbeddingCache(config)
+
+
+async def test_miss_embeds_the_original_question() -> None:
+    cache, embedder = _cache(), Embedder()
+
+    first = await cache.get_or_embed(MODEL, "What is the  Due Date?", embedder.one)
+    second = await cache.get_or_embed(MODEL, "what is the due date? ", embedder.one)
+
+    assert embedder.calls == [["What is the  Due Date?"]]
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_disabled_cache_passes_questions_through() -> None:
+    cache, embedder = _cache(enabled=False), Embedder()
+
+    await cache.get_or_embed(MODEL, "Due Date?", embedder.one)
+    await cache.get_or_embed(MODEL, "Due Date?", embedder.one)
+    await cache.get_or_embed_many(MODEL, ["A?", " a? "], embedder.many)
+
+    assert embedder.calls == [["Due Date?"], ["Due Date?"], ["A?", " a? "]]
+    assert cache.stats().entries == 0
+
+
+async def test_expired_entries_are_embedded_again() -> None:
+    cache, embedder = _cache(ttl_seconds=0), Embedder()
+
+    await cache.get_or_embed(MODEL, "question", embedder.one)
+    await cache.get_or_embed(MODEL, "question", embedder.one)
+
+    assert len(embedder.calls) == 2
+    assert cache.misses == 2
+
+
+async def test_least_recently_used_entry_is_evicted() -> None:
+    cache, embedder = _cache(max_entries=2), Embedder()
+
+    await cache.get_or_embed(MODEL, "first", embedder.one)
+    await cache.get_or_embed(MODEL, "second", embedder.one)
+    await cache.get_or_embed(MODEL, "first", embedder.one)
+    await cache.get_or_embed(MODEL, "third", embedder.one)
+
+    # "second" era a menos usada e saiu; "first" continua em cache
+    await cache.get_or_embed(MODEL, "first", embedder.one)
+    await cache.get_or_embed(MODEL, "second", embedder.one)
+    assert embedder.calls == [["first"], ["second"], ["third"], ["second"]]
+
+
+async def test_concurrent_misses_share_one_call() -> None:
+    cache, embedder = _cache(), Embedder(delay=0.05)
+
+    results = await asyncio.gather(
+        *(cache.get_or_embed(MODEL, question, embedder.one) for question in ["Q?", "q?", " Q? "])
+    )
+
+    assert embedder.calls == [["Q?"]]
+    assert results[0] == results[1] == results[2]
+
+
+async def test_many_embeds_only_the_misses() -> None:
+    cache, embedder = _cache(), Embedder()
+    cached = await cache.get_or_embed(MODEL, "Cached?", embedder.one)
+
+    results = await cache.get_or_embed_many(
+        MODEL, ["cached?", "New One?", "new  one?", "Other?"], embedder.many
+    )
+
+    assert embedder.calls == [["Cached?"], ["New One?", "Other?"]]
+    assert results[0] == cached
+    assert results[1] == results[2] == [8.0, float(sum(map(ord, "New One?")))]
+    assert (cache.hits, cache.misses) == (2, 3)
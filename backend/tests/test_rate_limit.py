@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import time
+
+from app.rag.rate_limit import TokenBucket
+
+
+async def test_acquire_within_capacity_does_not_wait() -> None:
+    bucket = TokenBucket(capacity=10, period=60)
+
+    start = time.monotonic()
+    await bucket.acquire(4)
+    await bucket.acquire(6)
+
+    assert time.monotonic() - start < 0.05
+    assert bucket.level < 1
+
+
+async def test_acquire_waits_for_refill() -> None:
+    # 100 unidades por segundo
+    bucket = TokenBucket(capacity=10, period=0.1)
+    await bucket.acquire(10)
+
+    start = time.monotonic()
+    await bucket.acquire(5)
+
+    assert time.monotonic() - start >= 0.04
+
+
+async def test_acquire_more_than_capacity_is_capped() -> None:
+    bucket = TokenBucket(capacity=10, period=60)
+
+    start = time.monotonic()
+    await bucket.acquire(1000)
+
+    assert time.monotonic() - start < 0.05
+    assert bucket.level < 1
+
+
+def test_update_adopts_server_limits() -> None:
+    bucket = TokenBucket(capacity=100, period=60)
+
+    bucket.update(limit=50, remaining=20)
+
+    assert bucket.capacity == 50
+    assert bucket.level <= 20
+
+
+def test_update_ignores_missing_values() -> None:
+    bucket = TokenBucket(capacity=100, period=60)
+
+    bucket.update(limit=None, remaining=None)
+
+    assert bucket.capacity == 100
+    assert bucket.level > 99
+
+
+def test_pause_empties_the_bucket() -> None:
+    bucket = TokenBucket(capacity=60, period=60)
+
+    bucket.pause(5)
+
+    # 1 unidade por segundo: 5 segundos de pausa deixam o nível em -5
+    assert bucket.level <= -4.9
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.documents.service import DocumentService, FileTooLargeError
+
+
+async def _chunks(*parts: bytes) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def service(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> DocumentService:
+    monkeypatch.setattr(settings.app, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings.app, "max_file_size", 10)
+    return DocumentService()
+
+
+def _files(root: Path) -> list[Path]:
+    return sorted(path for path in root.rglob("*") if path.is_file())
+
+
+async def test_stores_by_content_hash(service: DocumentService, tmp_path: Path) -> None:
+    file_path, content_hash = await service.store_stream(_chunks(b"hello", b" you"), ".pdf")
+
+    assert content_hash == hashlib.sha256(b"hello you").hexdigest()
+    assert file_path == tmp_path / content_hash[:2] / f"{content_hash}.pdf"
+    assert file_path.read_bytes() == b"hello you"
+    assert _files(tmp_path) == [file_path]
+
+
+async def test_file_at_the_limit_is_accepted(service: DocumentService) -> None:
+    file_path, _ = await service.store_stream(_chunks(b"12345", b"67890"), ".png")
+    assert file_path.stat().st_size == 10
+
+
+async def test_oversized_stream_leaves_no_temp_file(
+    service: DocumentService, tmp_path: Path
+) -> None:
+    with pytest.raises(FileTooLargeError):
+        await service.store_stream(_chunks(b"123456", b"78901"), ".pdf")
+
+    assert _files(tmp_path) == []
+
+
+async def test_cancelled_upload_leaves_no_temp_file(
+    service: DocumentService, tmp_path: Path
+) -> None:
+    async def _stalled() -> AsyncIterator[bytes]:
+        yield b"part"
+        await asyncio.sleep(10)
+        yield b"never"
+
+    task = asyncio.create_task(service.store_stream(_stalled(), ".pdf"))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert _files(tmp_path) == []
+
+
+async def test_identical_content_reuses_the_stored_file(
+    service: DocumentService, tmp_path: Path
+) -> None:
+    first_path, first_hash = await service.store_stream(_chunks(b"same"), ".pdf")
+    second_path, second_hash = await service.store_stream(_chunks(b"sa", b"me"), ".pdf")
+    other_path, _ = await service.store_stream(_chunks(b"other"), ".pdf")
+
+    assert (second_path, second_hash) == (first_path, first_hash)
+    assert other_path != first_path
+    # Nenhum .upload-* temporário sobra depois de reaproveitar o arquivo
+    assert _files(tmp_path) == sorted([first_path, other_path])
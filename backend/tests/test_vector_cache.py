@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.core.vector_cache import DocumentVectors
+
+
+def test_from_rows_without_chunks_searches_empty() -> None:
+    vectors = DocumentVectors.from_rows([], ttl_seconds=60)
+
+    assert vectors.matrix.shape[0] == 0
+    assert vectors.search([0.1, 0.2, 0.3], "cosine", limit=5) == []
+
+
+def _rows() -> list[tuple[int, str, list[float]]]:
+    rng = np.random.default_rng(7)
+    return [(index, f"chunk {index}", rng.normal(size=8).tolist()) for index in range(20)]
+
+
+def _reference_distances(rows: list, query: np.ndarray, metric: str) -> np.ndarray:
+    matrix = np.asarray([row[2] for row in rows], dtype=np.float64)
+    if metric == "cosine":
+        return 1 - matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    if metric == "euclidean":
+        return np.linalg.norm(matrix - query, axis=1)
+    return -(matrix @ query)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "inner_product"])
+def test_search_matches_exact_scan(metric: str) -> None:
+    rows = _rows()
+    vectors = DocumentVectors.from_rows(rows, ttl_seconds=60)
+    query = np.random.default_rng(11).normal(size=8)
+
+    results = vectors.search(query.tolist(), metric, limit=5)
+
+    expected = _reference_distances(rows, query, metric)
+    order = np.argsort(expected)[:5]
+    assert [result["chunk_id"] for result in results] == [int(index) for index in order]
+    assert [result["content"] for result in results] == [f"chunk {index}" for index in order]
+    np.testing.assert_allclose(
+        [result["distance"] for result in results], expected[order], rtol=1e-4, atol=1e-5
+    )
+
+
+def test_search_limit_larger_than_document() -> None:
+    vectors = DocumentVectors.from_rows(_rows()[:3], ttl_seconds=60)
+
+    assert len(vectors.search([1.0] * 8, "cosine", limit=10)) == 3
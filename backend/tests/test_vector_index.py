@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+from app.core.vector_index import VectorIndexManager
+
+pytestmark = [pytest.mark.db, pytest.mark.usefixtures("database")]
+
+
+async def test_query_plans_use_the_indexes() -> None:
+    """Cross-document, per-document and full-text queries use the HNSW, document_id
+    and GIN indexes while sequential scans are disabled.
+    """
+    manager = VectorIndexManager()
+    assert await manager.ensure_indexes(drop_stale=False)
+
+    assert await manager.check_query_plans() == []
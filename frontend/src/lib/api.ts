@@ -5,10 +5,12 @@ import {
   DocumentDetail,
   DocumentSummary,
   DocumentUploadResult,
+  IngestionJob,
   RAGQuestionResponse,
 } from '@/types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+const JOB_POLL_INTERVAL_MS = 1000;
 
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -36,7 +38,7 @@ class DocumentService {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response: AxiosResponse<APIResponse<DocumentUploadResult>> = await apiClient.post(
+    const response: AxiosResponse<APIResponse<IngestionJob>> = await apiClient.post(
       '/documents/upload',
       formData,
       {
@@ -46,9 +48,32 @@ class DocumentService {
       }
     );
 
+    return this.waitForIngestion(response.data.data.id);
+  }
+
+  async getIngestionJob(id: number): Promise<IngestionJob> {
+    const response: AxiosResponse<APIResponse<IngestionJob>> = await apiClient.get(`/documents/jobs/${id}`);
     return response.data.data;
   }
 
+  async waitForIngestion(jobId: number): Promise<DocumentUploadResult> {
+    for (;;) {
+      const job = await this.getIngestionJob(jobId);
+
+      if (job.status === 'completed') {
+        if (job.result) {
+          return job.result;
+        }
+        throw new Error('Processed document is no longer available');
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Document processing failed');
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  }
+
   async listDocuments(): Promise<DocumentSummary[]> {
     const response: AxiosResponse<ListResponse<DocumentSummary>> = await apiClient.get('/documents/');
     return response.data.data;
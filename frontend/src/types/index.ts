@@ -38,18 +38,47 @@ export interface DocumentUploadResult {
   text_length: number;
   processing_time_ms: number;
   created_at: string;
+  pages: PageExtractionResult[];
+  extraction_timings_ms: Record<string, number>;
   rag_processing: {
     chunks_created: number;
     rag_processing_time_ms: number;
     status: string;
+    deduplicated?: boolean;
   };
 }
 
+export interface PageExtractionResult {
+  page_number: number;
+  text_length: number;
+  method: 'text_layer' | 'ocr';
+  error?: string | null;
+}
+
+export type IngestionJobStatus = 'queued' | 'running' | 'completed' | 'failed';
+
+export interface IngestionJob {
+  id: number;
+  file_name: string;
+  status: IngestionJobStatus;
+  stage?: 'deduplication' | 'extraction' | 'chunking' | 'embedding' | null;
+  progress: number;
+  stage_timings_ms: Record<string, number>;
+  error?: string | null;
+  attempts: number;
+  document_id?: number | null;
+  result?: DocumentUploadResult | null;
+  created_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+}
+
 // RAG Types
 export interface QuestionRequest {
   question: string;
   document_id?: number;
   max_chunks?: number;
+  search_mode?: 'vector' | 'hybrid';
 }
 
 export interface SourceChunk {
@@ -66,6 +95,55 @@ export interface RAGQuestionResponse {
   processing_time_ms: number;
   method: string;
   created_at: string;
+  cached?: boolean;
+  cache_similarity?: number | null;
+}
+
+// Server-Sent Events of POST /documents/{id}/question/stream
+export interface RAGStreamSources {
+  source_chunks: SourceChunk[];
+  retrieval_time_ms: number;
+}
+
+export interface RAGStreamToken {
+  content: string;
+}
+
+export interface RAGStreamDone {
+  retrieval_time_ms: number;
+  first_token_ms: number | null;
+  processing_time_ms: number;
+  method: string;
+  cached?: boolean;
+}
+
+// Server-Sent Events of POST /documents/{id}/questions/batch
+export interface BatchQuestionRequest {
+  questions: string[];
+  max_chunks?: number;
+}
+
+export interface RAGBatchAnswer {
+  index: number;
+  question: string;
+  answer: string;
+  source_chunks: SourceChunk[];
+  processing_time_ms: number;
+  cached?: boolean;
+}
+
+export interface RAGBatchError {
+  index?: number;
+  question?: string;
+  detail: string;
+}
+
+export interface RAGBatchDone {
+  questions: number;
+  failed: number;
+  embedding_time_ms: number;
+  retrieval_time_ms: number;
+  processing_time_ms: number;
 }
 
 // Error Types